@@ -1,21 +1,135 @@
+import os
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
 
-    # OpenAI settings
-    openai_api_key: str
-    openai_model: str
+    # OpenAI settings (checked when the first client is created, so the app imports without them)
+    openai_api_key: str = ""
+    openai_model: str = ""
 
-    # Pinecone settings
-    pinecone_api_key: str
-    pinecone_index_name: str
+    # HTTP connection pools shared by the OpenAI, Pinecone and R2 clients
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30
+    http_timeout: float = 60
+    http_connect_timeout: float = 5
+    # HTTP/2 for the OpenAI clients (opt-in, needs the h2 package: pip install httpx[http2])
+    http2: bool = False
+
+    # Client-side limits on OpenAI and Pinecone calls (per minute, 0 = unlimited). The concurrency
+    # limit halves when the API returns 429 and grows back as calls succeed.
+    openai_requests_per_minute: int = 0
+    openai_tokens_per_minute: int = 0
+    openai_max_concurrency: int = 64
+    pinecone_requests_per_minute: int = 0
+    pinecone_max_concurrency: int = 64
+
+    # Retries of throttled (429), timed-out and 5xx calls, after Retry-After or an exponential backoff
+    max_retries: int = 5
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 30
+
+    # Admission control: requests in flight before new ones get a 503 (0 = unlimited), and the
+    # OpenAI rate limit backlog in seconds above which chat requests are refused
+    max_chat_requests: int = 256
+    max_upload_requests: int = 64
+    admission_max_backlog: float = 10
+
+    # Create clients and load parsers at startup instead of on the first request
+    warmup: bool = False
+
+    # Add a Server-Timing header with the duration of each pipeline stage to every response
+    timing_header: bool = False
+
+    # Vector store settings ("pinecone", "local" or "ivf"; local stores need no Pinecone credentials)
+    vector_store: str = "pinecone"
+    pinecone_api_key: str = ""
+    pinecone_index_name: str = ""
+    local_index_path: str = "data/vector_index"
+
+    # Hybrid retrieval settings (BM25 keyword search fused with vector search)
+    hybrid_search: bool = True
+    hybrid_candidates: int = 20
+    rrf_k: int = 60
+    keyword_index_path: str = "data/keyword_index.db"
+
+    # Batch chat settings
+    batch_max_questions: int = 500
+    batch_llm_concurrency: int = 8
+
+    # Request coalescing: concurrent identical embeddings, vector queries and chat answers share one
+    # call, and question embeddings requested while others are in flight are sent together after
+    # waiting up to the window (milliseconds)
+    coalesce_requests: bool = True
+    embedding_batch_window_ms: float = 5
+
+    # Context packing settings
+    context_max_tokens: int = 6000
+    context_dedup_threshold: float = 0.9
+
+    # Compact vectors: embedding dimensions requested from the model (0 = the model's full 1536;
+    # the index must have the same dimension), and quantized codes scored by local stores ("none",
+    # "int8" or "binary"), whose best top_k * rerank_factor candidates are re-ranked with float vectors
+    embedding_dimensions: int = 0
+    vector_quantization: str = "none"
+    quantization_rerank_factor: int = 10
+
+    # IVF index settings (ivf_nlist = 0 picks 4 * sqrt(vector count) clusters)
+    ivf_nlist: int = 0
+    ivf_nprobe: int = 16
+    ivf_min_train_size: int = 10_000
+
+    # Ingestion settings
+    embedding_batch_size: int = 256
+    embedding_batch_max_tokens: int = 100_000
+    upsert_batch_size: int = 100
+    manifest_path: str = "data/manifests.db"
+    delete_batch_size: int = 1000
+
+    # Document catalog (listing); reconciled with storage at startup and every interval (0 = startup only)
+    catalog_path: str = "data/catalog.db"
+    catalog_reconcile_interval: float = 3600
+
+    # Bulk upload limits (archives count by their expanded size)
+    bulk_max_files: int = 5000
+    bulk_max_bytes: int = 2 * 1024 ** 3
+
+    # Chunking settings ("auto" = "markdown" for .md files, "paragraphs" otherwise)
+    chunking_strategy: str = "auto"
+    chunk_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+
+    # PDF extraction settings (PDFs with at least `pdf_parallel_min_pages`
+    # pages are extracted by a process pool)
+    pdf_extraction_workers: int = min(4, os.cpu_count() or 1)
+    pdf_parallel_min_pages: int = 64
+    pdf_pages_per_task: int = 32
+
+    # Ingestion job settings
+    ingestion_workers: int = 2
+    jobs_path: str = "data/jobs.db"
+    staging_dir: str = "data/staging"
+
+    # Embedding cache settings ("tiered" = memory LRU + SQLite, "memory" or "none")
+    embedding_cache: str = "tiered"
+    embedding_cache_memory_entries: int = 10_000
+    embedding_cache_disk_entries: int = 1_000_000
+    embedding_cache_path: str = "data/embedding_cache.db"
+
+    # Semantic answer cache settings
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_max_entries: int = 1000
+    answer_cache_ttl_seconds: float = 3600
 
     # R2 settings (optional - for cloud storage)
     r2_account_id: str | None = None
     r2_access_key_id: str | None = None
     r2_secret_access_key: str | None = None
     r2_bucket_name: str | None = None
+    r2_part_size: int = 8 * 1024 * 1024
+    r2_upload_concurrency: int = 4
 
     @property
     def use_r2_storage(self) -> bool:
@@ -1,13 +1,132 @@
-from fastapi import APIRouter, FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from app.config import settings
-from app.routers import chat
+from app.routers import chat, jobs
+from app.services import (
+    admission, answer_cache, catalog_service, clients, coalescing, extraction_service, job_service, metrics,
+    pinecone_service, rate_limiter, tokenizer
+)
+from app.services.embedding_service import cache_stats
+
+
+def _list_stored_files():
+    if settings.use_r2_storage:
+        from app.services.storage_service import iter_files
+        return iter_files()
+
+    from app.services.document_service import iter_uploaded_files
+    return iter_uploaded_files()
+
+
+def _warm_up() -> None:
+    """Create clients, import parsers and open the indexes before the first request."""
+    clients.start()
+    extraction_service.load_parsers()
+    tokenizer.count_tokens("warm up")
+    pinecone_service.get_store()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup:
+        await asyncio.to_thread(_warm_up)
+    job_service.start()
+    catalog_service.start(_list_stored_files)
+    yield
+    catalog_service.shutdown()
+    job_service.shutdown()
+    extraction_service.shutdown()
+    await clients.close()
+
 
 app = FastAPI(
     title="Pinecone RAG API",
     description="A starter API for RAG (Retrieval Augmented Generation) with Pinecone and OpenAI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(admission.AdmissionControl)
+
+if settings.timing_header:
+    @app.middleware("http")
+    async def add_server_timing(request: Request, call_next):
+        timings = metrics.start_request_timings()
+        response = await call_next(request)
+        # Streamed responses send their headers before the later stages run
+        if timings:
+            response.headers["Server-Timing"] = metrics.server_timing(timings)
+        return response
+
+
+def _collect_cache_metrics():
+    embedding = cache_stats()
+    answers = answer_cache.cache.stats()
+
+    yield "rag_cache_hits_total", "counter", "Cache hits", [
+        ({"cache": "embedding"}, embedding["hits"]), ({"cache": "answer"}, answers["hits"])
+    ]
+    yield "rag_cache_misses_total", "counter", "Cache misses", [
+        ({"cache": "embedding"}, embedding["misses"]), ({"cache": "answer"}, answers["misses"])
+    ]
+
+
+def _collect_pool_metrics():
+    pools = {name: stats for name, stats in clients.pool_stats().items() if stats}
+
+    for key, metric_type, description in (
+        ("requests", "counter", "Requests sent per HTTP client"),
+        ("connections_opened", "counter", "Connections opened per HTTP client"),
+        ("in_flight", "gauge", "Requests in flight per HTTP client"),
+        ("max_connections", "gauge", "Connection pool size per HTTP client"),
+    ):
+        yield f"rag_http_{key}" + ("_total" if metric_type == "counter" else ""), metric_type, description, [
+            ({"client": name}, stats.get(key)) for name, stats in pools.items()
+        ]
+
+
+def _collect_limit_metrics():
+    limiters = {limiter.name: limiter.stats() for limiter in (rate_limiter.openai, rate_limiter.pinecone)}
+    gates = admission.stats()
+
+    yield "rag_external_retries_total", "counter", "Retried calls to external services", [
+        ({"service": name}, stats["retries"]) for name, stats in limiters.items()
+    ]
+    yield "rag_external_throttled_total", "counter", "Calls rejected with 429 by external services", [
+        ({"service": name}, stats["throttled"]) for name, stats in limiters.items()
+    ]
+    yield "rag_external_concurrency_limit", "gauge", "Adaptive concurrency limit per external service", [
+        ({"service": name}, stats["concurrency_limit"]) for name, stats in limiters.items()
+    ]
+    yield "rag_requests_in_flight", "gauge", "Requests in flight per admission group", [
+        ({"group": name}, stats["in_flight"]) for name, stats in gates.items()
+    ]
+    yield "rag_requests_rejected_total", "counter", "Requests refused with 503 per admission group", [
+        ({"group": name}, stats["rejected"]) for name, stats in gates.items()
+    ]
+
+
+def _collect_coalescing_metrics():
+    stats = coalescing.stats()
+
+    yield "rag_coalesced_calls_total", "counter", "Calls that shared an identical call already in flight", [
+        ({"kind": name}, flight["coalesced"]) for name, flight in stats["single_flight"].items()
+    ]
+    yield "rag_batched_items_total", "counter", "Items sent in micro-batches", [
+        ({"kind": name}, batcher["items"]) for name, batcher in stats["batching"].items()
+    ]
+    yield "rag_batches_total", "counter", "Micro-batches sent", [
+        ({"kind": name}, batcher["batches"]) for name, batcher in stats["batching"].items()
+    ]
+
+
+metrics.register_collector(_collect_cache_metrics)
+metrics.register_collector(_collect_pool_metrics)
+metrics.register_collector(_collect_limit_metrics)
+metrics.register_collector(_collect_coalescing_metrics)
+
 v1 = APIRouter(prefix="/api/v1")
 
 if settings.use_r2_storage:
@@ -17,14 +136,28 @@ else:
 
 v1.include_router(documents.router)
 v1.include_router(chat.router)
+v1.include_router(jobs.router)
 
 app.include_router(v1)
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def health_check():
     return {
         "status": "online",
         "storage": settings.storage_type,
+        "vector_store": settings.vector_store,
+        "embedding_cache": cache_stats(),
+        "answer_cache": answer_cache.cache.stats(),
+        "http_pools": clients.pool_stats(),
+        "rate_limits": {"openai": rate_limiter.openai.stats(), "pinecone": rate_limiter.pinecone.stats()},
+        "admission": admission.stats(),
+        "coalescing": coalescing.stats(),
         "message": "Pinecone RAG API is running!"
     }
@@ -1,12 +1,39 @@
+import json
 from fastapi import APIRouter, HTTPException
-from app.services.llm_service import generate_answer
-from app.schemas.chat import ChatRequest, ChatResponse, Source
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.services.llm_service import generate_answer_async, generate_answers_async, stream_answer_async
+from app.schemas.chat import (
+    BatchChatRequest,
+    BatchChatResponse,
+    BatchChatResult,
+    ChatRequest,
+    ChatResponse,
+    Source,
+)
 
 
 # Create router
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
+def _sse(event: str, data) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _to_sources(sources: list[dict]) -> list[Source]:
+    return [
+        Source(
+            filename=s["filename"],
+            chunk_index=s["chunk_index"],
+            score=s["score"],
+            text=s["text"]
+        )
+        for s in sources
+    ]
+
+
 @router.post("", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
@@ -14,8 +41,10 @@ async def chat(request: ChatRequest):
 
     This uses RAG (Retrieval Augmented Generation):
     1. Searches for relevant document chunks
-    2. Sends them to the LLM as context
-    3. LLM generates a natural language answer
+    2. Merges adjacent chunks, drops duplicates and packs them into the
+       context token budget (savings are reported in `context`)
+    3. Sends them to the LLM as context
+    4. LLM generates a natural language answer
 
     The answer is based ONLY on your documents, not on general knowledge.
     """
@@ -28,23 +57,14 @@ async def chat(request: ChatRequest):
 
     try:
         # Generate answer using RAG
-        result = generate_answer(request.question, request.max_sources)
-
-        # Format sources
-        sources = [
-            Source(
-                filename=s["filename"],
-                chunk_index=s["chunk_index"],
-                score=s["score"],
-                text=s["text"]
-            )
-            for s in result["sources"]
-        ]
+        result = await generate_answer_async(request.question, request.max_sources)
 
         return ChatResponse(
             question=request.question,
             answer=result["answer"],
-            sources=sources
+            sources=_to_sources(result["sources"]),
+            context=result["context"],
+            cached=result["cached"]
         )
 
     except Exception as e:
@@ -52,3 +72,95 @@ async def chat(request: ChatRequest):
             status_code=500,
             detail=f"Error generating answer: {str(e)}"
         )
+
+
+@router.post("/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """
+    Ask many questions in one request.
+
+    All questions are embedded in one go, retrieval runs concurrently and
+    at most `BATCH_LLM_CONCURRENCY` answers are generated at a time. Each
+    question gets its own result in request order; a question that fails
+    is reported with `success: false` and an `error` without failing the
+    rest of the batch.
+    """
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.batch_max_questions} questions"
+        )
+
+    valid = [question for question in request.questions if question.strip()]
+
+    try:
+        answers = iter(await generate_answers_async(valid, request.max_sources) if valid else [])
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating answers: {str(e)}"
+        )
+
+    results = []
+
+    for question in request.questions:
+        if not question.strip():
+            results.append(BatchChatResult(question=question, success=False, error="Question cannot be empty"))
+            continue
+
+        answer = next(answers)
+
+        if isinstance(answer, Exception):
+            results.append(BatchChatResult(
+                question=question,
+                success=False,
+                error=f"Error generating answer: {str(answer)}"
+            ))
+        else:
+            results.append(BatchChatResult(
+                question=question,
+                success=True,
+                answer=answer["answer"],
+                sources=_to_sources(answer["sources"]),
+                context=answer["context"],
+                cached=answer["cached"]
+            ))
+
+    succeeded = sum(result.success for result in results)
+
+    return BatchChatResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Ask a question and stream the answer as Server-Sent Events.
+
+    Events, in order:
+    - `sources`: list of sources used as context (sent before any tokens)
+    - `context`: context packing statistics (omitted when nothing was found)
+    - `token`: a piece of the generated answer (sent many times)
+    - `done`: the answer is complete
+    - `error`: generation failed; no further events follow
+    """
+    if not request.question.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Question cannot be empty"
+        )
+
+    async def event_stream():
+        try:
+            async for event, data in stream_answer_async(request.question, request.max_sources):
+                yield _sse(event, data)
+            yield _sse("done", {})
+
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error generating answer: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
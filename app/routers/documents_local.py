@@ -1,9 +1,30 @@
+import asyncio
 import os
 import shutil
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
-from app.services.document_service import process_document, delete_document_by_filename, UPLOAD_DIR, ALLOWED_EXTENSIONS
-from app.schemas.document import DocumentUploadResponse, DocumentDeleteResponse, DocumentListResponse, DocumentInfo
+import uuid
+from email.utils import parsedate_to_datetime
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from app.services.document_service import (
+    delete_document_by_filename_async,
+    delete_documents_by_filename_async,
+    UPLOAD_DIR,
+    ALLOWED_EXTENSIONS,
+)
+from app.config import settings
+from app.services.archive_service import ARCHIVE_EXTENSIONS, save_uploads
+from app.services.chunking_service import available_strategies
+from app.services import catalog_service
+from app.services.job_service import submit
+from app.schemas.document import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    BulkUploadResponse,
+    DocumentUploadResponse,
+    DocumentDeleteResponse,
+    DocumentListResponse,
+    DocumentInfo,
+)
 
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
@@ -13,16 +34,72 @@ def _is_allowed_file(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
 
 
-@router.post("", response_model=DocumentUploadResponse, status_code=201)
-async def upload_document(file: UploadFile = File(...)):
+def _document_exists(filename: str) -> bool:
+    """Whether `filename` is a stored document; names with path components never are."""
+    return (
+        os.path.basename(filename) == filename
+        and _is_allowed_file(filename)
+        and os.path.isfile(os.path.join(UPLOAD_DIR, filename))
+    )
+
+
+def _is_not_modified(request: Request, etag: str, modified_at: float) -> bool:
+    """Whether the client's cached copy is current. If-None-Match takes precedence over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def _save_upload(file: UploadFile, file_path: str) -> None:
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+
+def _staged_path(filename: str) -> str:
+    """Path in the staging folder where a bulk-uploaded document waits until the whole upload is accepted."""
+    os.makedirs(settings.staging_dir, exist_ok=True)
+    return os.path.join(settings.staging_dir, uuid.uuid4().hex + os.path.splitext(filename)[1])
+
+
+def _publish(saved: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Move staged documents into the uploads folder, replacing files with the same name."""
+    published = []
+
+    try:
+        for filename, staged_path in saved:
+            file_path = os.path.join(UPLOAD_DIR, filename)
+            shutil.move(staged_path, file_path)
+            published.append((filename, file_path))
+    except Exception:
+        for _, staged_path in saved[len(published):]:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        raise
+
+    return published
+
+
+@router.post("", response_model=DocumentUploadResponse, status_code=202)
+async def upload_document(file: UploadFile = File(...), chunking: str | None = Form(None)):
     """
-    Upload a document (PDF or DOCX).
+    Upload a document (PDF, DOCX, TXT or MD).
 
-    The document will be:
-    1. Saved to the uploads folder
-    2. Text extracted from document
-    3. Split into chunks
-    4. Each chunk saved to Pinecone for semantic search
+    The document is saved to the uploads folder and queued for ingestion.
+    The response returns immediately with a job ID; poll
+    `GET /api/v1/jobs/{job_id}` for progress. The ingestion job will:
+    1. Extract text from document
+    2. Split into chunks using the `chunking` strategy (default: "auto")
+    3. Save new chunks to Pinecone for semantic search
     """
     if not _is_allowed_file(file.filename):
         raise HTTPException(
@@ -30,62 +107,176 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"Only [{', '.join(ALLOWED_EXTENSIONS)}] files are allowed"
         )
 
+    chunking = chunking or settings.chunking_strategy
+    if chunking not in available_strategies():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chunking strategy '{chunking}'. Available: {', '.join(available_strategies())}"
+        )
+
     os.makedirs(UPLOAD_DIR, exist_ok=True)
 
     file_path = os.path.join(UPLOAD_DIR, file.filename)
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
     try:
-        chunks_created = process_document(file.filename, file_path)
+        await asyncio.to_thread(_save_upload, file, file_path)
+        job = await asyncio.to_thread(submit, file.filename, file_path, chunking)
 
-        return DocumentUploadResponse(
-            success=True,
-            filename=file.filename,
-            chunks_created=chunks_created,
-            message=f"Document processed successfully. Created {chunks_created} chunks."
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error storing document: {str(e)}"
         )
 
-    except Exception as e:
+    return DocumentUploadResponse(
+        success=True,
+        filename=file.filename,
+        job_id=job["id"],
+        status=job["status"],
+        message="Document stored and queued for processing."
+    )
+
+
+@router.post("/bulk", response_model=BulkUploadResponse, status_code=202)
+async def upload_documents(files: list[UploadFile] = File(...), chunking: str | None = Form(None)):
+    """
+    Upload many documents at once, as separate files and/or zip or tar archives.
+
+    Archives are expanded; their documents are saved under their base name
+    and files with unsupported extensions are listed in `skipped`. Every
+    document gets its own ingestion job, and up to `INGESTION_WORKERS` jobs
+    run at the same time.
+    """
+    chunking = chunking or settings.chunking_strategy
+    if chunking not in available_strategies():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chunking strategy '{chunking}'. Available: {', '.join(available_strategies())}"
+        )
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+    # Documents are staged until the whole upload is accepted, so a failed
+    # upload never overwrites stored documents with the same name
+    try:
+        saved, skipped = await asyncio.to_thread(
+            save_uploads,
+            [(file.filename, file.file) for file in files],
+            ALLOWED_EXTENSIONS,
+            _staged_path
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    if not saved:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No [{', '.join([*ALLOWED_EXTENSIONS, *ARCHIVE_EXTENSIONS])}] files found in the upload"
+        )
 
+    try:
+        saved = await asyncio.to_thread(_publish, saved)
+    except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing document: {str(e)}"
+            detail=f"Error storing documents: {str(e)}"
         )
 
+    documents = []
+    for filename, file_path in saved:
+        job = await asyncio.to_thread(submit, filename, file_path, chunking)
+        documents.append(DocumentUploadResponse(
+            success=True,
+            filename=filename,
+            job_id=job["id"],
+            status=job["status"],
+            message="Document stored and queued for processing."
+        ))
 
-@router.get("", response_model=DocumentListResponse)
-async def list_documents():
+    return BulkUploadResponse(documents=documents, skipped=skipped, total=len(documents))
+
+
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_documents(request: BulkDeleteRequest):
     """
-    List all uploaded documents.
+    Delete many documents and all their chunks from Pinecone.
+
+    Chunks are deleted in batches instead of one request per document.
+    Filenames that don't exist are listed in `not_found`.
+    """
+    filenames = list(dict.fromkeys(request.filenames))
+    exists = {f: _document_exists(f) for f in filenames}
+    found = [f for f in filenames if exists[f]]
+    not_found = [f for f in filenames if not exists[f]]
+
+    chunks_deleted = await delete_documents_by_filename_async(found) if found else {}
+
+    for filename in found:
+        os.remove(os.path.join(UPLOAD_DIR, filename))
+
+    return BulkDeleteResponse(
+        documents=[
+            DocumentDeleteResponse(
+                success=True,
+                filename=filename,
+                chunks_deleted=chunks_deleted[filename],
+                message=f"Document deleted successfully. Removed {chunks_deleted[filename]} chunks."
+            )
+            for filename in found
+        ],
+        not_found=not_found,
+        chunks_deleted=sum(chunks_deleted.values())
+    )
+
+
+@router.get("", response_model=DocumentListResponse)
+async def list_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    prefix: str | None = None,
+    extension: str | None = None
+):
     """
-    if not os.path.exists(UPLOAD_DIR):
-        return DocumentListResponse(documents=[], total=0)
+    List documents in filename order, one page at a time.
 
-    docs = [
-        DocumentInfo(filename=f, size_bytes=os.path.getsize(os.path.join(UPLOAD_DIR, f)))
-        for f in os.listdir(UPLOAD_DIR)
-        if _is_allowed_file(f)
-    ]
+    Pass the returned `next_cursor` as `cursor` to get the next page. Results
+    can be filtered by filename `prefix` and `extension` (e.g. "pdf").
+    """
+    documents, total, next_cursor = await catalog_service.list_documents_async(limit, cursor, prefix, extension)
 
-    return DocumentListResponse(documents=docs, total=len(docs))
+    return DocumentListResponse(
+        documents=[DocumentInfo(**doc) for doc in documents],
+        total=total,
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/{filename}")
-async def get_document(filename: str):
+async def get_document(filename: str, request: Request):
     """
     Download a specific document.
+
+    Supports `Range` requests (206 Partial Content) and conditional requests
+    with `If-None-Match` or `If-Modified-Since` (304 Not Modified).
     """
     file_path = os.path.join(UPLOAD_DIR, filename)
 
-    if not os.path.exists(file_path):
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Document '{filename}' not found")
 
-    return FileResponse(file_path, filename=filename, media_type="application/octet-stream")
+    response = FileResponse(
+        file_path, filename=filename, media_type="application/octet-stream", stat_result=stat_result
+    )
+
+    if _is_not_modified(request, response.headers["etag"], stat_result.st_mtime):
+        return Response(
+            status_code=304,
+            headers={"etag": response.headers["etag"], "last-modified": response.headers["last-modified"]}
+        )
+
+    return response
 
 
 @router.delete("/{filename}", response_model=DocumentDeleteResponse)
@@ -104,7 +295,7 @@ async def delete_document(filename: str):
             detail=f"Document '{filename}' not found"
         )
 
-    chunks_deleted = delete_document_by_filename(filename)
+    chunks_deleted = await delete_document_by_filename_async(filename)
 
     os.remove(file_path)
 
@@ -1,11 +1,29 @@
+import asyncio
 import os
 import shutil
-import tempfile
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse
-from app.services.document_service import process_document, delete_document_by_filename, ALLOWED_EXTENSIONS
-from app.services import storage_service
-from app.schemas.document import DocumentUploadResponse, DocumentDeleteResponse, DocumentListResponse, DocumentInfo
+import uuid
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from app.config import settings
+from app.services.document_service import (
+    delete_document_by_filename_async,
+    delete_documents_by_filename_async,
+    ALLOWED_EXTENSIONS,
+)
+from app.services.archive_service import ARCHIVE_EXTENSIONS, save_uploads
+from app.services.chunking_service import available_strategies
+from app.services.job_service import submit
+from app.services import catalog_service, storage_service
+from app.schemas.document import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    BulkUploadResponse,
+    DocumentUploadResponse,
+    DocumentDeleteResponse,
+    DocumentListResponse,
+    DocumentInfo,
+)
 
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
@@ -15,16 +33,34 @@ def _is_allowed_file(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
 
 
-@router.post("", response_model=DocumentUploadResponse, status_code=201)
-async def upload_document(file: UploadFile = File(...)):
+def _staged_path(filename: str) -> str:
+    """Path in the staging folder where a document waits for its ingestion job."""
+    os.makedirs(settings.staging_dir, exist_ok=True)
+    return os.path.join(settings.staging_dir, uuid.uuid4().hex + os.path.splitext(filename)[1])
+
+
+def _stage_upload(file: UploadFile) -> str:
+    """Copy an upload to the staging folder, where it waits for its ingestion job."""
+    staged_path = _staged_path(file.filename)
+
+    with open(staged_path, "wb") as staged:
+        shutil.copyfileobj(file.file, staged)
+
+    return staged_path
+
+
+@router.post("", response_model=DocumentUploadResponse, status_code=202)
+async def upload_document(file: UploadFile = File(...), chunking: str | None = Form(None)):
     """
     Upload a document (PDF, DOCX, TXT or MD).
 
-    The document will be:
-    1. Saved to Cloudflare R2 storage
-    2. Text extracted from document
-    3. Split into chunks
-    4. Each chunk saved to Pinecone for semantic search
+    The document is staged locally and queued for ingestion. The response
+    returns immediately with a job ID; poll `GET /api/v1/jobs/{job_id}` for
+    progress. The ingestion job will:
+    1. Extract text from document
+    2. Split into chunks using the `chunking` strategy (default: "auto")
+    3. Save new chunks to Pinecone for semantic search
+    4. Save the document to Cloudflare R2 storage
     """
     if not _is_allowed_file(file.filename):
         raise HTTPException(
@@ -32,62 +68,165 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"Only [{', '.join(ALLOWED_EXTENSIONS)}] files are allowed"
         )
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
+    chunking = chunking or settings.chunking_strategy
+    if chunking not in available_strategies():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chunking strategy '{chunking}'. Available: {', '.join(available_strategies())}"
+        )
 
     try:
-        chunks_created = process_document(file.filename, tmp_path)
-        storage_service.upload_file(tmp_path, file.filename)
-
-        return DocumentUploadResponse(
-            success=True,
-            filename=file.filename,
-            chunks_created=chunks_created,
-            message=f"Document processed successfully. Created {chunks_created} chunks."
-        )
+        staged_path = await asyncio.to_thread(_stage_upload, file)
+        job = await asyncio.to_thread(submit, file.filename, staged_path, chunking)
 
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing document: {str(e)}"
+            detail=f"Error storing document: {str(e)}"
         )
 
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    return DocumentUploadResponse(
+        success=True,
+        filename=file.filename,
+        job_id=job["id"],
+        status=job["status"],
+        message="Document stored and queued for processing."
+    )
+
 
+@router.post("/bulk", response_model=BulkUploadResponse, status_code=202)
+async def upload_documents(files: list[UploadFile] = File(...), chunking: str | None = Form(None)):
+    """
+    Upload many documents at once, as separate files and/or zip or tar archives.
 
-@router.get("", response_model=DocumentListResponse)
-async def list_documents():
+    Archives are expanded; their documents are saved under their base name
+    and files with unsupported extensions are listed in `skipped`. Every
+    document gets its own ingestion job, and up to `INGESTION_WORKERS` jobs
+    run at the same time.
+    """
+    chunking = chunking or settings.chunking_strategy
+    if chunking not in available_strategies():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chunking strategy '{chunking}'. Available: {', '.join(available_strategies())}"
+        )
+
+    try:
+        saved, skipped = await asyncio.to_thread(
+            save_uploads,
+            [(file.filename, file.file) for file in files],
+            ALLOWED_EXTENSIONS,
+            _staged_path
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not saved:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No [{', '.join([*ALLOWED_EXTENSIONS, *ARCHIVE_EXTENSIONS])}] files found in the upload"
+        )
+
+    documents = []
+    for filename, staged_path in saved:
+        job = await asyncio.to_thread(submit, filename, staged_path, chunking)
+        documents.append(DocumentUploadResponse(
+            success=True,
+            filename=filename,
+            job_id=job["id"],
+            status=job["status"],
+            message="Document stored and queued for processing."
+        ))
+
+    return BulkUploadResponse(documents=documents, skipped=skipped, total=len(documents))
+
+
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_documents(request: BulkDeleteRequest):
     """
-    List all uploaded documents.
+    Delete many documents and all their chunks from Pinecone.
+
+    Chunks are deleted in batches and files with R2 batch deletes (1000
+    keys per request). Filenames that don't exist are listed in `not_found`.
     """
-    files = storage_service.list_files()
+    exists = await storage_service.files_exist_async(list(dict.fromkeys(request.filenames)))
+    found = [f for f, present in exists.items() if present]
+    not_found = [f for f, present in exists.items() if not present]
+
+    chunks_deleted = {}
+    if found:
+        chunks_deleted = await delete_documents_by_filename_async(found)
+        await storage_service.delete_files_async(found)
+
+    return BulkDeleteResponse(
+        documents=[
+            DocumentDeleteResponse(
+                success=True,
+                filename=filename,
+                chunks_deleted=chunks_deleted[filename],
+                message=f"Document deleted successfully. Removed {chunks_deleted[filename]} chunks."
+            )
+            for filename in found
+        ],
+        not_found=not_found,
+        chunks_deleted=sum(chunks_deleted.values())
+    )
 
-    docs = [
-        DocumentInfo(filename=f["filename"], size_bytes=f["size_bytes"])
-        for f in files
-        if _is_allowed_file(f["filename"])
-    ]
 
-    return DocumentListResponse(documents=docs, total=len(docs))
+@router.get("", response_model=DocumentListResponse)
+async def list_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    prefix: str | None = None,
+    extension: str | None = None
+):
+    """
+    List documents in filename order, one page at a time.
+
+    Pass the returned `next_cursor` as `cursor` to get the next page. Results
+    can be filtered by filename `prefix` and `extension` (e.g. "pdf").
+    """
+    documents, total, next_cursor = await catalog_service.list_documents_async(limit, cursor, prefix, extension)
+
+    return DocumentListResponse(
+        documents=[DocumentInfo(**doc) for doc in documents],
+        total=total,
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/{filename}")
-async def get_document(filename: str):
+async def get_document(filename: str, request: Request):
     """
     Download a specific document.
+
+    Supports `Range` requests (206 Partial Content), `If-Range`, and
+    conditional requests with `If-None-Match` or `If-Modified-Since` (304 Not
+    Modified). They are answered by R2 in a single request, unless the file
+    changed since the client's `If-Range`.
     """
-    if not storage_service.file_exists(filename):
+    try:
+        file = await storage_service.get_file_async(
+            filename,
+            request.headers.get("range"),
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+            request.headers.get("if-range")
+        )
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Document '{filename}' not found")
+    except ValueError as e:
+        raise HTTPException(status_code=416, detail=str(e))
 
-    file_stream = storage_service.get_file_stream(filename)
+    if file["status"] == 304:
+        return Response(status_code=304, headers=file["headers"])
 
     return StreamingResponse(
-        file_stream,
+        file["body"],
+        status_code=file["status"],
         media_type="application/octet-stream",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        headers={**file["headers"], "Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(file["close"])
     )
 
 
@@ -96,14 +235,14 @@ async def delete_document(filename: str):
     """
     Delete a document and all its chunks from Pinecone.
     """
-    if not storage_service.file_exists(filename):
+    if not await storage_service.file_exists_async(filename):
         raise HTTPException(
             status_code=404,
             detail=f"Document '{filename}' not found"
         )
 
-    chunks_deleted = delete_document_by_filename(filename)
-    storage_service.delete_file(filename)
+    chunks_deleted = await delete_document_by_filename_async(filename)
+    await storage_service.delete_file_async(filename)
 
     return DocumentDeleteResponse(
         success=True,
@@ -0,0 +1,46 @@
+import time
+from fastapi import APIRouter, HTTPException
+from app.services.job_service import get_job
+from app.schemas.job import JobResponse
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def to_job_response(job: dict) -> JobResponse:
+    """Build the API representation of a job."""
+    duration = None
+    if job["started_at"] is not None:
+        duration = (job["finished_at"] or time.time()) - job["started_at"]
+
+    return JobResponse(
+        id=job["id"],
+        filename=job["filename"],
+        chunking=job["chunking"],
+        status=job["status"],
+        chunks_total=job["chunks_total"],
+        chunks_embedded=job["chunks_embedded"],
+        chunks_created=job["chunks_created"],
+        error=job["error"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        duration_seconds=duration
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the status of an ingestion job.
+
+    `chunks_embedded` / `chunks_total` report progress: `chunks_total` is the
+    number of chunks that need embedding (unchanged chunks of a re-uploaded
+    document are skipped) and is null until text extraction has finished.
+    """
+    job = get_job(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    return to_job_response(job)
@@ -17,9 +17,48 @@ class Source(BaseModel):
     text: str
 
 
+class ContextStats(BaseModel):
+    """How the retrieved chunks were packed into the LLM context."""
+
+    chunks_retrieved: int
+    chunks_used: int
+    tokens_before: int = Field(description="Context tokens if every retrieved chunk were sent as is")
+    tokens_after: int = Field(description="Context tokens actually sent")
+    tokens_saved: int
+
+
 class ChatResponse(BaseModel):
     """Response containing the answer and sources."""
 
     question: str
     answer: str
     sources: list[Source]
+    context: ContextStats | None = Field(default=None, description="Context packing statistics")
+    cached: bool = Field(default=False, description="Whether the answer came from the semantic answer cache")
+
+
+class BatchChatRequest(BaseModel):
+    """Request body for batch chat."""
+
+    questions: list[str] = Field(..., min_length=1, description="The questions to ask")
+    max_sources: int = Field(default=10, ge=1, le=50, description="Max documents to search per question")
+
+
+class BatchChatResult(BaseModel):
+    """Answer to one question of a batch, or the error it failed with."""
+
+    question: str
+    success: bool
+    answer: str | None = None
+    sources: list[Source] = []
+    context: ContextStats | None = None
+    cached: bool = False
+    error: str | None = None
+
+
+class BatchChatResponse(BaseModel):
+    """Per-question results of a batch, in request order."""
+
+    results: list[BatchChatResult]
+    succeeded: int
+    failed: int
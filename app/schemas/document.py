@@ -1,15 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DocumentUploadResponse(BaseModel):
-    """Response after uploading a document."""
+    """Response after uploading a document and queueing it for ingestion."""
 
     success: bool
     filename: str
-    chunks_created: int
+    job_id: str
+    status: str
     message: str
 
 
+class BulkUploadResponse(BaseModel):
+    """Response after uploading many documents and queueing them for ingestion."""
+
+    documents: list[DocumentUploadResponse]
+    skipped: list[str]
+    total: int
+
+
 class DocumentDeleteResponse(BaseModel):
     """Response after deleting a document."""
 
@@ -19,15 +28,33 @@ class DocumentDeleteResponse(BaseModel):
     message: str
 
 
+class BulkDeleteRequest(BaseModel):
+    """Request to delete many documents."""
+
+    filenames: list[str] = Field(..., min_length=1)
+
+
+class BulkDeleteResponse(BaseModel):
+    """Response after deleting many documents."""
+
+    documents: list[DocumentDeleteResponse]
+    not_found: list[str]
+    chunks_deleted: int
+
+
 class DocumentInfo(BaseModel):
-    """Document metadata."""
+    """Document metadata. Chunk count, hash and ingest time are None until the document is ingested."""
 
     filename: str
     size_bytes: int
+    chunk_count: int | None = None
+    file_hash: str | None = None
+    ingested_at: float | None = None
 
 
 class DocumentListResponse(BaseModel):
-    """Response containing list of documents."""
+    """Response containing one page of documents."""
 
     documents: list[DocumentInfo]
-    total: int
+    total: int | None = Field(default=None, description="Matching documents; null when filtering by prefix")
+    next_cursor: str | None = None
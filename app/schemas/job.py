@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    """Status and progress of an ingestion job."""
+
+    id: str
+    filename: str
+    chunking: str
+    status: str
+    chunks_total: int | None
+    chunks_embedded: int
+    chunks_created: int | None
+    error: str | None
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+    duration_seconds: float | None
@@ -0,0 +1,104 @@
+import json
+import math
+from app.config import settings
+from app.services import rate_limiter
+
+
+# Requests over the limits are refused straight away with a 503, so an
+# overloaded instance sheds load instead of queueing requests that would
+# time out anyway.
+
+# Seconds clients are asked to wait when the instance is full
+_RETRY_AFTER = 1
+
+
+class Gate:
+    """Requests in flight for one group of routes."""
+
+    def __init__(self, name: str, limit: int, max_backlog: float | None = None):
+        self.name = name
+        self.limit = limit
+        self.max_backlog = max_backlog
+        self.in_flight = 0
+        self.rejected = 0
+
+    def enter(self) -> int | None:
+        """Admit a request, or return the Retry-After seconds to refuse it with."""
+        if self.limit and self.in_flight >= self.limit:
+            self.rejected += 1
+            return _RETRY_AFTER
+
+        if self.max_backlog:
+            backlog = rate_limiter.openai.backlog()
+            if backlog > self.max_backlog:
+                self.rejected += 1
+                return math.ceil(backlog)
+
+        self.in_flight += 1
+        return None
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+
+chat = Gate("chat", settings.max_chat_requests, settings.admission_max_backlog)
+upload = Gate("upload", settings.max_upload_requests)
+
+_UPLOAD_PATHS = ("/api/v1/documents", "/api/v1/documents/bulk")
+
+
+def _gate(scope: dict) -> Gate | None:
+    path = scope["path"].rstrip("/")
+
+    if path.startswith("/api/v1/chat"):
+        return chat
+    if scope["method"] == "POST" and path in _UPLOAD_PATHS:
+        return upload
+    return None
+
+
+async def _reject(send, retry_after: int) -> None:
+    body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControl:
+    """
+    ASGI middleware that refuses chat and upload requests with a 503 and a
+    `Retry-After` header when their group has its maximum of requests in
+    flight, or, for chat, when the OpenAI rate limits are backed up by more
+    than `admission_max_backlog` seconds. A request counts until its whole
+    response, including a stream, was sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        gate = _gate(scope) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = gate.enter()
+        if retry_after is not None:
+            await _reject(send, retry_after)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.leave()
+
+
+def stats() -> dict:
+    return {gate.name: {"in_flight": gate.in_flight, "rejected": gate.rejected} for gate in (chat, upload)}
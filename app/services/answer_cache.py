@@ -0,0 +1,157 @@
+import threading
+import time
+import numpy as np
+from app.config import settings
+
+
+class AnswerCache:
+    """
+    Semantic cache of chat answers keyed on the question embedding.
+
+    A lookup returns a cached answer when a stored question with the same
+    `max_results` has cosine similarity >= `threshold` to the new one.
+    Entries are dropped when any document they cite is invalidated, and
+    answers computed while a cited document changed are never stored.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors = None
+        self._entries = [None] * max_entries
+        self._next_slot = 0
+        self._version = 0
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        """Current invalidation version. Pass it back to `store`."""
+        return self._version
+
+    def lookup(self, embedding: list[float], max_results: int) -> dict | None:
+        """Return a cached result for a similar question, or None."""
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                return None
+
+            query = _normalize(embedding)
+            scores = self._vectors @ query
+            now = time.time()
+
+            for slot in np.argsort(scores)[::-1]:
+                if scores[slot] < self.threshold:
+                    break
+
+                entry = self._entries[slot]
+                if entry is None or entry["max_results"] != max_results:
+                    continue
+
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._clear_slot(slot)
+                    continue
+
+                self.hits += 1
+                return entry["result"]
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: list[float], max_results: int, result: dict, version: int) -> None:
+        """
+        Cache a result computed after `version()` returned `version`.
+
+        The result is skipped if it has no sources or if any cited document
+        was invalidated since then.
+        """
+        filenames = {source["filename"] for source in result["sources"]}
+
+        if not filenames:
+            return
+
+        with self._lock:
+            if any(self._invalidated_at.get(f, -1) >= version for f in filenames):
+                return
+
+            vector = _normalize(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+
+            slot = self._next_slot
+            self._next_slot = (slot + 1) % self.max_entries
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                "max_results": max_results,
+                "filenames": filenames,
+                "created_at": time.time(),
+                "result": result,
+            }
+
+    def invalidate(self, filename: str) -> int:
+        """Drop every entry that cites `filename`. Returns the number removed."""
+        removed = 0
+
+        with self._lock:
+            self._invalidated_at[filename] = self._version
+            self._version += 1
+
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and filename in entry["filenames"]:
+                    self._clear_slot(slot)
+                    removed += 1
+
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the answer cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": sum(1 for entry in self._entries if entry is not None),
+        }
+
+    def _clear_slot(self, slot: int) -> None:
+        self._entries[slot] = None
+        self._vectors[slot] = 0.0
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+cache = AnswerCache(
+    threshold=settings.answer_cache_threshold,
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+)
+
+
+def version() -> int:
+    """Current invalidation version of the shared cache."""
+    return cache.version()
+
+
+def lookup(embedding: list[float], max_results: int) -> dict | None:
+    """Look up a cached answer, or None if the cache is disabled or misses."""
+    if not settings.answer_cache_enabled:
+        return None
+    return cache.lookup(embedding, max_results)
+
+
+def store(embedding: list[float], max_results: int, result: dict, version: int) -> None:
+    """Cache an answer if the cache is enabled."""
+    if settings.answer_cache_enabled:
+        cache.store(embedding, max_results, result, version)
+
+
+def invalidate(filename: str) -> int:
+    """Drop cached answers that cite `filename`."""
+    return cache.invalidate(filename)
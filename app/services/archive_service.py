@@ -0,0 +1,104 @@
+import os
+import tarfile
+import zipfile
+from app.config import settings
+
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+_COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _iter_members(file_obj, archive_name: str):
+    """Yield (name, stream) for each regular file of a zip or tar archive."""
+    if archive_name.lower().endswith(".zip"):
+        with zipfile.ZipFile(file_obj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    else:
+        # Streaming mode reads the tar sequentially, without seeking
+        with tarfile.open(fileobj=file_obj, mode="r|*") as archive:
+            for info in archive:
+                if info.isfile():
+                    yield info.name, archive.extractfile(info)
+
+
+def _copy(source, file_path: str, budget: int) -> int:
+    """Copy a stream to a file, failing once more than `budget` bytes were written."""
+    written = 0
+
+    with open(file_path, "wb") as target:
+        for block in iter(lambda: source.read(_COPY_BLOCK_SIZE), b""):
+            written += len(block)
+            if written > budget:
+                raise ValueError(f"Uploaded archives expand to more than {settings.bulk_max_bytes} bytes")
+            target.write(block)
+
+    return written
+
+
+def save_uploads(uploads: list[tuple[str, object]], allowed_extensions: set[str], destination) -> tuple[list, list]:
+    """
+    Save uploaded files, expanding zip and tar archives, for ingestion.
+
+    Archive members are stored under their base name (folders inside the
+    archive are ignored); if a name appears twice, the last file wins.
+    Hidden files and files with an unsupported extension are skipped. If
+    anything fails, the files saved so far are removed.
+
+    Args:
+        uploads: List of (filename, file object) pairs
+        allowed_extensions: Extensions of documents that can be ingested
+        destination: Called with a document filename, returns the local
+            path to save it to
+
+    Returns:
+        ([(filename, saved path)], [skipped filenames])
+    """
+    saved = {}
+    skipped = []
+    budget = settings.bulk_max_bytes
+
+    def add(name: str, stream) -> None:
+        nonlocal budget
+        filename = os.path.basename(name.replace("\\", "/"))
+
+        if filename.startswith(".") or "__MACOSX/" in name or not filename.lower().endswith(tuple(allowed_extensions)):
+            skipped.append(name)
+            return
+
+        if filename not in saved and len(saved) >= settings.bulk_max_files:
+            raise ValueError(f"A bulk upload can contain at most {settings.bulk_max_files} documents")
+
+        previous_path = saved.pop(filename, None)
+        file_path = destination(filename)
+        if previous_path is not None and previous_path != file_path:
+            os.remove(previous_path)
+
+        saved[filename] = file_path
+        budget -= _copy(stream, file_path, budget)
+
+    try:
+        for filename, file_obj in uploads:
+            if is_archive(filename):
+                try:
+                    for name, member in _iter_members(file_obj, filename):
+                        add(name, member)
+                except (zipfile.BadZipFile, tarfile.TarError) as e:
+                    raise ValueError(f"Could not read archive '{filename}': {e}")
+            else:
+                add(filename, file_obj)
+
+    except Exception:
+        for file_path in saved.values():
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+
+    return list(saved.items()), skipped
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from app.config import settings
+from app.services.extraction_service import ALLOWED_EXTENSIONS
+from app.services.manifest_service import get_manifest
+
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("filename", "size_bytes", "chunk_count", "file_hash", "ingested_at")
+
+_lock = threading.Lock()
+_conn = None
+_stop = threading.Event()
+_thread = None
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """
+    Add what older catalogs lack: the lower-cased `extension` column, which
+    is indexed for filtering, and the per-extension document counts, which
+    triggers keep up to date on insert and delete.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+    if "extension" not in columns:
+        conn.execute("ALTER TABLE documents ADD COLUMN extension TEXT NOT NULL DEFAULT ''")
+        conn.executemany(
+            "UPDATE documents SET extension = ? WHERE filename = ?",
+            [(_extension(filename), filename) for (filename,) in conn.execute("SELECT filename FROM documents")]
+        )
+
+    conn.execute("CREATE INDEX IF NOT EXISTS documents_extension ON documents (extension, filename)")
+
+    has_counts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_counts'"
+    ).fetchone()
+    if not has_counts:
+        conn.execute("CREATE TABLE document_counts (extension TEXT PRIMARY KEY, documents INTEGER NOT NULL)")
+        conn.execute(
+            "INSERT INTO document_counts (extension, documents) "
+            "SELECT extension, COUNT(*) FROM documents GROUP BY extension"
+        )
+
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS documents_counted AFTER INSERT ON documents BEGIN "
+        "INSERT INTO document_counts (extension, documents) VALUES (NEW.extension, 1) "
+        "ON CONFLICT (extension) DO UPDATE SET documents = documents + 1; END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS documents_uncounted AFTER DELETE ON documents BEGIN "
+        "UPDATE document_counts SET documents = documents - 1 WHERE extension = OLD.extension; END"
+    )
+
+
+def _connection() -> sqlite3.Connection:
+    """Open the catalog database on first use."""
+    global _conn
+
+    if _conn is None:
+        os.makedirs(os.path.dirname(settings.catalog_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(settings.catalog_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "filename TEXT PRIMARY KEY, size_bytes INTEGER NOT NULL, chunk_count INTEGER, "
+                "file_hash TEXT, ingested_at REAL, extension TEXT NOT NULL DEFAULT '')"
+            )
+            _migrate(conn)
+        _conn = conn
+
+    return _conn
+
+
+def record(filename: str, size_bytes: int, chunk_count: int, file_hash: str) -> None:
+    """Add or update a document after it was ingested."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            # An upsert rather than INSERT OR REPLACE, which would delete the
+            # row without firing the trigger that keeps the counts
+            conn.execute(
+                "INSERT INTO documents (filename, size_bytes, chunk_count, file_hash, ingested_at, extension) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (filename) DO UPDATE SET "
+                "size_bytes = excluded.size_bytes, chunk_count = excluded.chunk_count, "
+                "file_hash = excluded.file_hash, ingested_at = excluded.ingested_at",
+                (filename, size_bytes, chunk_count, file_hash, time.time(), _extension(filename))
+            )
+
+
+def remove(filenames: list[str]) -> None:
+    """Remove documents from the catalog."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany("DELETE FROM documents WHERE filename = ?", [(f,) for f in filenames])
+
+
+def _normalize_extension(extension: str) -> str:
+    return extension.lower() if extension.startswith(".") else "." + extension.lower()
+
+
+def _filters(prefix: str | None, extension: str | None) -> tuple[list[str], list]:
+    clauses = []
+    params = []
+
+    if prefix:
+        # A range on the primary key instead of LIKE, so the index is used
+        clauses.append("filename >= ? AND filename < ?")
+        params += [prefix, prefix + "\U0010ffff"]
+
+    if extension:
+        clauses.append("extension = ?")
+        params.append(_normalize_extension(extension))
+
+    return clauses, params
+
+
+def _count(conn: sqlite3.Connection, extension: str | None) -> int:
+    if extension:
+        row = conn.execute(
+            "SELECT documents FROM document_counts WHERE extension = ?", (_normalize_extension(extension),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    return conn.execute("SELECT COALESCE(SUM(documents), 0) FROM document_counts").fetchone()[0]
+
+
+def list_documents(limit: int = 100, cursor: str | None = None, prefix: str | None = None,
+                   extension: str | None = None) -> tuple[list[dict], int | None, str | None]:
+    """
+    List documents in filename order, one page at a time.
+
+    Args:
+        limit: Maximum number of documents to return
+        cursor: `next_cursor` of the previous page, or None for the first page
+        prefix: Only list filenames starting with this prefix
+        extension: Only list filenames with this extension (e.g. "pdf")
+
+    Returns:
+        (documents, total number of matching documents, cursor of the next
+        page or None on the last page). The total comes from the kept
+        per-extension counts; it is None when filtering by prefix, which
+        would take a count of every match.
+    """
+    clauses, params = _filters(prefix, extension)
+    page_where = " AND ".join(clauses + ["filename > ?"] if cursor else clauses) or "1"
+    page_params = params + [cursor] if cursor else params
+
+    with _lock:
+        conn = _connection()
+        rows = conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM documents WHERE {page_where} ORDER BY filename LIMIT ?",
+            (*page_params, limit + 1)
+        ).fetchall()
+        total = None if prefix else _count(conn, extension)
+
+    documents = [dict(zip(_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = documents[-1]["filename"] if len(rows) > limit else None
+
+    return documents, total, next_cursor
+
+
+async def list_documents_async(limit: int = 100, cursor: str | None = None, prefix: str | None = None,
+                               extension: str | None = None) -> tuple[list[dict], int | None, str | None]:
+    """List documents from a worker thread."""
+    return await asyncio.to_thread(list_documents, limit, cursor, prefix, extension)
+
+
+def reconcile(files) -> tuple[int, int]:
+    """
+    Bring the catalog in line with the stored files.
+
+    Files missing from the catalog are added (with the chunk count and hash
+    of their manifest, if they were ingested), sizes are refreshed and
+    documents whose file is gone are removed. Stops early, without removing
+    anything, if the catalog is shutting down.
+
+    Args:
+        files: Iterable of {"filename", "size_bytes"} for every stored file
+
+    Returns:
+        (documents added or updated, documents removed)
+    """
+    with _lock:
+        known = dict(_connection().execute("SELECT filename, size_bytes FROM documents").fetchall())
+
+    seen = set()
+    changed = 0
+
+    for file in files:
+        if _stop.is_set():
+            return changed, 0
+
+        filename = file["filename"]
+        if not filename.lower().endswith(tuple(ALLOWED_EXTENSIONS)):
+            continue
+
+        seen.add(filename)
+
+        if filename not in known:
+            manifest = get_manifest(filename)
+            with _lock:
+                conn = _connection()
+                with conn:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO documents (filename, size_bytes, chunk_count, file_hash, extension) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (filename, file["size_bytes"], manifest and manifest["chunk_count"],
+                         manifest and manifest["file_hash"], _extension(filename))
+                    )
+            changed += 1
+        elif known[filename] != file["size_bytes"]:
+            with _lock:
+                conn = _connection()
+                with conn:
+                    conn.execute(
+                        "UPDATE documents SET size_bytes = ? WHERE filename = ?", (file["size_bytes"], filename)
+                    )
+            changed += 1
+
+    missing = [filename for filename in known if filename not in seen]
+    remove(missing)
+
+    return changed, len(missing)
+
+
+def _reconcile_loop(list_files) -> None:
+    while not _stop.is_set():
+        try:
+            changed, removed = reconcile(list_files())
+            logger.info("Catalog reconciled: %d added or updated, %d removed", changed, removed)
+        except Exception:
+            logger.exception("Catalog reconcile failed")
+
+        if settings.catalog_reconcile_interval <= 0:
+            return
+
+        _stop.wait(settings.catalog_reconcile_interval)
+
+
+def start(list_files) -> None:
+    """
+    Reconcile the catalog in a background thread, at startup and then every
+    `catalog_reconcile_interval` seconds (once if it is 0).
+
+    Args:
+        list_files: Called for each pass; returns an iterable of
+            {"filename", "size_bytes"} for every stored file
+    """
+    global _thread
+
+    _stop.clear()
+    _thread = threading.Thread(target=_reconcile_loop, args=(list_files,), name="catalog-reconcile", daemon=True)
+    _thread.start()
+
+
+def shutdown() -> None:
+    """Stop the background reconcile."""
+    global _thread
+
+    _stop.set()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
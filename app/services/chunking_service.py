@@ -0,0 +1,272 @@
+import re
+from app.config import settings
+from app.services import tokenizer
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+# Paragraphs longer than this are cut at the last sentence end, so text
+# without blank lines (common in PDFs) doesn't accumulate unbounded
+_MAX_PARAGRAPH_CHARS = 16_000
+
+
+class Chunker:
+    """
+    Base class for chunking strategies.
+
+    `split` consumes an iterable of text pieces (pages, paragraphs or blocks)
+    and yields chunks as soon as they are complete. Strategies must run in
+    linear time and only buffer a bounded window of text.
+    """
+
+    def split(self, text_stream):
+        raise NotImplementedError
+
+
+class CharacterChunker(Chunker):
+    """Fixed-size character windows with overlap."""
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 50):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def split(self, text_stream):
+        buffer = ""
+
+        for piece in text_stream:
+            buffer += piece
+            start = 0
+
+            while len(buffer) - start > self.chunk_size:
+                chunk = buffer[start:start + self.chunk_size].strip()
+                if chunk:
+                    yield chunk
+                start += self.chunk_size - self.overlap
+
+            buffer = buffer[start:]
+
+        chunk = buffer.strip()
+        if chunk:
+            yield chunk
+
+
+class TokenChunker(Chunker):
+    """Fixed-size token windows with overlap."""
+
+    def __init__(self, chunk_tokens: int, overlap_tokens: int):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def split(self, text_stream):
+        tokens = []
+
+        for piece in text_stream:
+            tokens.extend(tokenizer.encode(piece))
+            start = 0
+
+            while len(tokens) - start > self.chunk_tokens:
+                chunk = tokenizer.decode(tokens[start:start + self.chunk_tokens]).strip()
+                if chunk:
+                    yield chunk
+                start += self.chunk_tokens - self.overlap_tokens
+
+            del tokens[:start]
+
+        chunk = tokenizer.decode(tokens).strip()
+        if chunk:
+            yield chunk
+
+
+def _iter_paragraphs(text_stream):
+    """Re-split streamed text at blank lines, buffering only the unfinished paragraph."""
+    buffer = ""
+
+    for piece in text_stream:
+        buffer += piece
+        parts = _PARAGRAPH_BREAK.split(buffer)
+        buffer = parts.pop()
+
+        if len(buffer) > _MAX_PARAGRAPH_CHARS:
+            cut = max(buffer.rfind(". "), buffer.rfind("\n")) + 1 or len(buffer)
+            parts.append(buffer[:cut])
+            buffer = buffer[cut:]
+
+        for part in parts:
+            if part.strip():
+                yield part.strip()
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class ParagraphChunker(Chunker):
+    """
+    Packs whole paragraphs into chunks of up to `chunk_tokens` tokens.
+
+    Paragraphs that don't fit are split into sentences, and sentences that
+    still don't fit into token windows. Chunks never end mid-sentence unless
+    a single sentence is longer than the budget.
+    """
+
+    def __init__(self, chunk_tokens: int):
+        self.chunk_tokens = chunk_tokens
+
+    def split(self, text_stream):
+        return self._pack(("", paragraph) for paragraph in _iter_paragraphs(text_stream))
+
+    def _units(self, paragraph: str):
+        """Yield (separator, text, tokens) units of a paragraph that each fit the budget."""
+        tokens = tokenizer.count_tokens(paragraph)
+
+        if tokens <= self.chunk_tokens:
+            yield "\n\n", paragraph, tokens
+            return
+
+        separator = "\n\n"
+        for sentence in _SENTENCE_BREAK.split(paragraph):
+            tokens = tokenizer.count_tokens(sentence)
+
+            if tokens <= self.chunk_tokens:
+                yield separator, sentence, tokens
+            else:
+                for window in TokenChunker(self.chunk_tokens, 0).split([sentence]):
+                    yield separator, window, tokenizer.count_tokens(window)
+
+            separator = " "
+
+    def _pack(self, sections):
+        """
+        Pack (prefix, paragraph) pairs into chunks.
+
+        A chunk never mixes paragraphs with different prefixes, and each chunk
+        starts with its prefix.
+        """
+        current_prefix = None
+        budget = self.chunk_tokens
+        parts = []
+        size = 0
+
+        for prefix, paragraph in sections:
+            if prefix != current_prefix:
+                if parts:
+                    yield current_prefix + "".join(parts).lstrip()
+                current_prefix = prefix
+                budget = max(self.chunk_tokens - tokenizer.count_tokens(prefix), self.chunk_tokens // 2)
+                parts = []
+                size = 0
+
+            for separator, text, tokens in self._units(paragraph):
+                if parts and size + tokens > budget:
+                    yield current_prefix + "".join(parts).lstrip()
+                    parts = []
+                    size = 0
+
+                parts.append(separator + text)
+                size += tokens + 1
+
+        if parts:
+            yield current_prefix + "".join(parts).lstrip()
+
+
+class MarkdownChunker(ParagraphChunker):
+    """
+    Splits Markdown at headings and packs each section separately.
+
+    Every chunk starts with the path of headings it belongs to (e.g.
+    "# Guide > ## Install"), so a chunk keeps its context on its own.
+    Headings inside fenced code blocks are ignored.
+    """
+
+    def split(self, text_stream):
+        return self._pack(self._sections(text_stream))
+
+    def _sections(self, text_stream):
+        """Yield (heading path, paragraph) pairs."""
+        headings = []
+        paragraph = []
+        paragraph_chars = 0
+        in_fence = False
+
+        def prefix():
+            return " > ".join(headings) + "\n\n" if headings else ""
+
+        for line in _iter_lines(text_stream):
+            stripped = line.strip()
+
+            if stripped.startswith("```") or stripped.startswith("~~~"):
+                in_fence = not in_fence
+
+            heading = None if in_fence else _HEADING.match(stripped)
+
+            if heading or (not stripped and not in_fence):
+                if paragraph:
+                    yield prefix(), "\n".join(paragraph).strip()
+                    paragraph = []
+                    paragraph_chars = 0
+
+                if heading:
+                    level = len(heading.group(1))
+                    headings = [h for h in headings if len(h) - len(h.lstrip("#")) < level]
+                    headings.append(f"{heading.group(1)} {heading.group(2)}")
+                continue
+
+            paragraph.append(line)
+            paragraph_chars += len(line)
+
+            if paragraph_chars > _MAX_PARAGRAPH_CHARS:
+                yield prefix(), "\n".join(paragraph).strip()
+                paragraph = []
+                paragraph_chars = 0
+
+        if paragraph:
+            yield prefix(), "\n".join(paragraph).strip()
+
+
+def _iter_lines(text_stream):
+    """Re-split streamed text into lines, buffering only the unfinished line."""
+    buffer = ""
+
+    for piece in text_stream:
+        buffer += piece
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        yield from lines
+
+    if buffer:
+        yield buffer
+
+
+STRATEGIES = {
+    "characters": lambda: CharacterChunker(),
+    "tokens": lambda: TokenChunker(settings.chunk_tokens, settings.chunk_overlap_tokens),
+    "paragraphs": lambda: ParagraphChunker(settings.chunk_tokens),
+    "markdown": lambda: MarkdownChunker(settings.chunk_tokens),
+}
+
+
+def register_strategy(name: str, factory) -> None:
+    """Register a chunking strategy. `factory` is called with no arguments and returns a Chunker."""
+    STRATEGIES[name] = factory
+
+
+def available_strategies() -> list[str]:
+    """Names accepted by `get_chunker`, including "auto"."""
+    return ["auto", *STRATEGIES]
+
+
+def resolve_strategy(strategy: str, filename: str) -> str:
+    """Resolve "auto" to "markdown" for .md files and "paragraphs" otherwise."""
+    if strategy == "auto":
+        return "markdown" if filename.lower().endswith(".md") else "paragraphs"
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{strategy}'. Available: {available_strategies()}")
+
+    return strategy
+
+
+def get_chunker(strategy: str, filename: str) -> Chunker:
+    """Build the chunker for a strategy name (or "auto") and file."""
+    return STRATEGIES[resolve_strategy(strategy, filename)]()
@@ -0,0 +1,202 @@
+import importlib.util
+import logging
+import threading
+from app.config import settings
+
+
+# Client libraries are imported when their client is first created, so
+# importing the app stays fast and works without credentials.
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients = {}
+_pool_stats = {}
+
+
+def _use_http2() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)."""
+    if not settings.http2:
+        return False
+
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+        return False
+
+    return True
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+def _timeout():
+    import httpx
+
+    return httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+
+
+def _get(name: str, factory):
+    """Return a shared client, creating it on first use."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def _require(value: str | None, name: str) -> None:
+    if not value:
+        raise ValueError(f"{name} is not set")
+
+
+def _create_openai():
+    import httpx
+    import openai
+    from app.services.http_transport import PoolStats, CountingTransport
+
+    _require(settings.openai_api_key, "OPENAI_API_KEY")
+    stats = _pool_stats.setdefault("openai", PoolStats(settings.http_max_connections))
+    transport = httpx.HTTPTransport(limits=_limits(), http2=_use_http2())
+
+    return openai.OpenAI(
+        api_key=settings.openai_api_key,
+        # Retries are left to the rate limiter, which shares backoff across calls
+        max_retries=0,
+        http_client=httpx.Client(transport=CountingTransport(transport, stats), timeout=_timeout()),
+    )
+
+
+def _create_async_openai():
+    import httpx
+    import openai
+    from app.services.http_transport import PoolStats, AsyncCountingTransport
+
+    _require(settings.openai_api_key, "OPENAI_API_KEY")
+    stats = _pool_stats.setdefault("openai_async", PoolStats(settings.http_max_connections))
+    transport = httpx.AsyncHTTPTransport(limits=_limits(), http2=_use_http2())
+
+    return openai.AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        # Retries are left to the rate limiter, which shares backoff across calls
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=AsyncCountingTransport(transport, stats), timeout=_timeout()),
+    )
+
+
+def _create_pinecone():
+    import pinecone
+
+    _require(settings.pinecone_api_key, "PINECONE_API_KEY")
+    return pinecone.Pinecone(
+        api_key=settings.pinecone_api_key,
+        connection_pool_maxsize=settings.http_max_connections,
+    )
+
+
+def _create_s3():
+    import boto3
+    from botocore.config import Config
+
+    _require(settings.r2_account_id, "R2_ACCOUNT_ID")
+    return boto3.client(
+        "s3",
+        endpoint_url=f"https://{settings.r2_account_id}.r2.cloudflarestorage.com",
+        aws_access_key_id=settings.r2_access_key_id,
+        aws_secret_access_key=settings.r2_secret_access_key,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=settings.http_max_connections,
+            connect_timeout=settings.http_connect_timeout,
+            read_timeout=settings.http_timeout,
+            tcp_keepalive=True,
+        ),
+        region_name="auto",
+    )
+
+
+def openai_client():
+    """Shared sync OpenAI client (embeddings during ingestion, sync chat)."""
+    return _get("openai", _create_openai)
+
+
+def async_openai_client():
+    """Shared async OpenAI client (chat routes)."""
+    return _get("openai_async", _create_async_openai)
+
+
+def pinecone_client():
+    """Shared Pinecone client."""
+    return _get("pinecone", _create_pinecone)
+
+
+def s3_client():
+    """Shared S3 client for Cloudflare R2."""
+    return _get("s3", _create_s3)
+
+
+def start() -> None:
+    """Create the clients this configuration uses, so the first request doesn't pay for it."""
+    openai_client()
+    async_openai_client()
+
+    if settings.vector_store == "pinecone":
+        pinecone_client()
+
+    if settings.use_r2_storage:
+        s3_client()
+
+
+async def close() -> None:
+    """Close every client and its connection pool."""
+    with _lock:
+        clients = dict(_clients)
+        _clients.clear()
+
+    for name, client in clients.items():
+        try:
+            if name == "openai_async":
+                await client.close()
+            elif hasattr(client, "close"):
+                client.close()
+        except Exception:
+            logger.exception("Error closing the %s client", name)
+
+
+def _s3_pool_stats(client) -> dict | None:
+    """Connection counts of botocore's urllib3 pools (not part of its public API, so best effort)."""
+    try:
+        manager = client._endpoint.http_session._manager
+        pools = [manager.pools[key] for key in manager.pools.keys()]
+    except AttributeError:
+        return None
+
+    requests = sum(pool.num_requests for pool in pools)
+    connections = sum(pool.num_connections for pool in pools)
+
+    return {
+        "max_connections": settings.http_max_connections,
+        "requests": requests,
+        "connections_opened": connections,
+        "connection_reuse": 1 - connections / requests if requests else None,
+    }
+
+
+def pool_stats() -> dict:
+    """Pool usage of each HTTP client that was created."""
+    stats = {name: pool.snapshot() for name, pool in _pool_stats.items()}
+
+    s3 = _clients.get("s3")
+    if s3 is not None:
+        stats["s3"] = _s3_pool_stats(s3)
+
+    return stats
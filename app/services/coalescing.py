@@ -0,0 +1,121 @@
+import asyncio
+
+
+# Coalescing of concurrent calls on the async request path. Results are
+# shared between callers, not copied, so callers must not modify them.
+
+_single_flights = []
+_batchers = []
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight call, and every
+    caller gets its result or exception.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks = {}
+        _single_flights.append(self)
+
+    def _done(self, key, task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved, in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key, fn):
+        """Await `fn()`, or the call already in flight for `key`."""
+        task = self._tasks.get(key)
+
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda task: self._done(key, task))
+        else:
+            self.coalesced += 1
+
+        # A cancelled caller doesn't cancel the call the others are waiting for
+        return await asyncio.shield(task)
+
+
+class MicroBatcher:
+    """
+    Groups items submitted by concurrent callers into one `process(items)`
+    call, which returns one result per item.
+
+    When no batch is in flight, items are sent on the next event loop
+    iteration, so a lone request isn't delayed. While batches are in
+    flight, items are collected for up to `window` seconds or until
+    `max_size` are waiting.
+    """
+
+    def __init__(self, name: str, process, window: float, max_size: int):
+        self.name = name
+        self.process = process
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        _batchers.append(self)
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            delay = self.window if self._tasks else 0
+            self._timer = loop.call_later(delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            self.items += len(batch)
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list) -> None:
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+
+def stats() -> dict:
+    return {
+        "single_flight": {
+            flight.name: {"calls": flight.calls, "coalesced": flight.coalesced} for flight in _single_flights
+        },
+        "batching": {
+            batcher.name: {"batches": batcher.batches, "items": batcher.items} for batcher in _batchers
+        },
+    }
@@ -0,0 +1,186 @@
+import re
+from app.config import settings
+from app.services import tokenizer
+
+
+# Longest overlap looked for between the end of a chunk and the start of the next
+_MAX_OVERLAP_CHARS = 1000
+
+# Shorter matches between adjacent chunks are treated as coincidence, not overlap
+_MIN_OVERLAP_CHARS = 8
+
+# Words per shingle when comparing chunks for near-duplicates
+_SHINGLE_WORDS = 5
+
+_WORD = re.compile(r"\w+")
+
+
+def format_document(position: int, filename: str, text: str) -> str:
+    """Format one document of the LLM context."""
+    return f"[Document {position} - {filename}]\n{text}"
+
+
+def _merge_text(previous: str, following: str) -> str:
+    """Join the texts of two consecutive chunks, removing the text they share."""
+    # Structure-aware chunks repeat their heading path as a first paragraph
+    heading, separator, rest = following.partition("\n\n")
+    if separator and heading.startswith("#") and previous.startswith(heading + "\n\n"):
+        following = rest
+
+    for size in range(min(len(previous), len(following), _MAX_OVERLAP_CHARS), _MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return previous + following[size:]
+
+    return previous + "\n" + following
+
+
+def _rank(doc: dict) -> float:
+    return doc.get("rrf_score", doc.get("score", 0.0))
+
+
+def _merge_adjacent(documents: list[dict]) -> list[dict]:
+    """
+    Merge hits on consecutive chunks of the same file into one span.
+
+    A span keeps the best score of its chunks and lists them in `chunks`.
+    Spans are ordered by their best rank, the fused `rrf_score` of hybrid
+    results or the score otherwise.
+    """
+    by_position = {}
+    for doc in documents:
+        metadata = doc.get("metadata", {})
+        key = (metadata.get("filename", "unknown"), metadata.get("chunk_index", 0))
+        if key not in by_position:
+            by_position[key] = doc
+
+    spans = []
+    previous_key = None
+
+    for key in sorted(by_position):
+        doc = by_position[key]
+        text = doc.get("metadata", {}).get("text", "")
+
+        if previous_key is not None and key[0] == previous_key[0] and key[1] == previous_key[1] + 1:
+            span = spans[-1]
+            span["text"] = _merge_text(span["text"], text)
+            span["score"] = max(span["score"], doc.get("score", 0.0))
+            span["rank"] = max(span["rank"], _rank(doc))
+            span["chunks"].append(doc)
+        else:
+            spans.append({
+                "filename": key[0],
+                "text": text,
+                "score": doc.get("score", 0.0),
+                "rank": _rank(doc),
+                "chunks": [doc]
+            })
+
+        previous_key = key
+
+    return sorted(spans, key=lambda span: span["rank"], reverse=True)
+
+
+def _shingles(text: str) -> set[int]:
+    words = _WORD.findall(text.lower())
+    if len(words) < _SHINGLE_WORDS:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + _SHINGLE_WORDS])) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+
+
+def _drop_duplicates(spans: list[dict], threshold: float) -> list[dict]:
+    """
+    Drop spans that are mostly contained in a better-ranked span.
+
+    A span is a near-duplicate when at least `threshold` of its word
+    shingles also appear in a span that was kept.
+    """
+    kept = []
+    kept_shingles = []
+
+    for span in spans:
+        shingles = _shingles(span["text"])
+        if any(len(shingles & other) >= threshold * len(shingles) for other in kept_shingles):
+            continue
+        kept.append(span)
+        kept_shingles.append(shingles)
+
+    return kept
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    return tokenizer.decode(tokenizer.encode(text)[:max_tokens])
+
+
+def pack_context(documents: list[dict], max_tokens: int | None = None) -> tuple[list[dict], dict]:
+    """
+    Assemble retrieved documents into the context sent to the LLM.
+
+    1. Hits on consecutive chunks of the same file are merged into one span,
+       without the text the chunks overlap on
+    2. Near-duplicate spans are dropped
+    3. Spans are packed best ranked first until `max_tokens` (default
+       `settings.context_max_tokens`) is reached; spans that don't fit are
+       skipped. If even the best span doesn't fit, it is truncated.
+
+    Returns:
+        The packed spans, shaped like retrieved documents (metadata with
+        filename and text, plus the merged `chunks`), and a dictionary of
+        statistics: chunks_retrieved, chunks_used, tokens_before (context
+        built from every retrieved chunk as is), tokens_after and tokens_saved
+    """
+    max_tokens = settings.context_max_tokens if max_tokens is None else max_tokens
+    spans = _drop_duplicates(_merge_adjacent(documents), settings.context_dedup_threshold)
+
+    packed = []
+    used_tokens = 0
+
+    for span in spans:
+        header_tokens = tokenizer.count_tokens(format_document(len(packed) + 1, span["filename"], "")) + 1
+        tokens = header_tokens + tokenizer.count_tokens(span["text"])
+
+        if used_tokens + tokens > max_tokens:
+            if packed:
+                continue
+            span["text"] = _truncate(span["text"], max(max_tokens - header_tokens, 0))
+            tokens = max_tokens
+
+        packed.append(span)
+        used_tokens += tokens
+
+    packed_documents = [
+        {
+            "score": span["score"],
+            "metadata": {"filename": span["filename"], "text": span["text"]},
+            "chunks": span["chunks"],
+        }
+        for span in packed
+    ]
+
+    tokens_before = tokenizer.count_tokens(build_context(documents))
+    tokens_after = tokenizer.count_tokens(build_context(packed_documents))
+
+    stats = {
+        "chunks_retrieved": len(documents),
+        "chunks_used": sum(len(span["chunks"]) for span in packed),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+    }
+
+    return packed_documents, stats
+
+
+def build_context(documents: list[dict]) -> str:
+    """
+    Build a context string from documents.
+
+    Args:
+        documents: Retrieved documents or packed spans
+
+    Returns:
+        Formatted context string
+    """
+    return "\n\n".join(
+        format_document(i, doc.get("metadata", {}).get("filename", "unknown"), doc.get("metadata", {}).get("text", ""))
+        for i, doc in enumerate(documents, 1)
+    )
@@ -1,13 +1,33 @@
+import asyncio
 import hashlib
-from pypdf import PdfReader
-from docx import Document
-from app.services.pinecone_service import upsert_document, list_ids_by_filename, delete_by_ids
+import os
+from app.config import settings
+from app.services import answer_cache, catalog_service, keyword_index, metrics
+from app.services.chunking_service import get_chunker, resolve_strategy
+from app.services.extraction_service import ALLOWED_EXTENSIONS, iter_text
+from app.services.manifest_service import get_manifest, save_manifest, delete_manifest
+from app.services.pinecone_service import (
+    upsert_documents,
+    update_metadata,
+    list_ids_by_filename,
+    list_ids_by_filenames,
+    delete_by_ids,
+)
 
 
 # Directory where uploaded files are stored
 UPLOAD_DIR = "uploads"
 
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".txt", ".md"}
+
+def iter_uploaded_files():
+    """Yield {"filename", "size_bytes"} for every file in the uploads folder."""
+    if not os.path.exists(UPLOAD_DIR):
+        return
+
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                yield {"filename": entry.name, "size_bytes": entry.stat().st_size}
 
 
 def _generate_doc_id(filename: str) -> str:
@@ -15,95 +35,224 @@ def _generate_doc_id(filename: str) -> str:
     return hashlib.md5(filename.encode()).hexdigest()
 
 
-def _extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from a PDF file."""
-    reader = PdfReader(file_path)
-    text = ""
+def _hash_file(file_path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _generate_chunk_id(base_id: str, chunk: str, seen: dict) -> str:
+    """
+    Generate a content-addressed chunk ID.
+
+    IDs are `{base_id}_{sha256(chunk)[:32]}`, so an unchanged chunk keeps its
+    ID across re-uploads. Repeated chunks within a document get a `-n`
+    suffix; `seen` counts occurrences per digest for the current document.
+    """
+    digest = hashlib.sha256(chunk.encode()).hexdigest()[:32]
+    occurrence = seen.get(digest, 0)
+    seen[digest] = occurrence + 1
+    return f"{base_id}_{digest}" if occurrence == 0 else f"{base_id}_{digest}-{occurrence}"
+
+
+def _discard_chunks(vector_ids: list[str], keyword_ids: list[str]) -> None:
+    """Delete the chunks a failed ingestion added, keeping the previous version of the document."""
+    delete_by_ids(vector_ids)
+    keyword_index.delete_chunks(keyword_ids)
+
+
+def process_document(filename: str, file_path: str, on_progress=None, chunking: str = "auto",
+                     before_commit=None) -> int:
+    """
+    Process a document: extract text, chunk it, and store in Pinecone and
+    the keyword index.
+
+    Text is extracted and chunked as a stream using the `chunking` strategy.
+    Chunks that are new since the last upload are embedded and upserted in
+    groups while extraction continues; unchanged chunks are skipped, moved
+    chunks get their `chunk_index` updated and chunks that disappeared are
+    deleted. An identical re-upload does nothing.
+
+    If ingestion fails before every new chunk is stored, the chunks it
+    added are deleted again and the previous version stays searchable.
+
+    Args:
+        filename: Name the document is stored under
+        file_path: Local path of the document
+        on_progress: Optional callback called as on_progress(embedded, total)
+            with the number of chunks embedded so far and the number to embed.
+            `total` is None until extraction has finished.
+        chunking: Chunking strategy name, or "auto" to pick one from the file type
+        before_commit: Optional callable run once every new chunk is stored,
+            before old chunks are deleted and the manifest is saved. If it
+            raises, the new chunks are discarded.
+
+    Returns:
+        Number of chunks in the document
+    """
+    strategy = resolve_strategy(chunking, filename)
+    file_hash = _hash_file(file_path)
+    manifest = get_manifest(filename)
+
+    # Documents ingested before hybrid search existed are re-chunked once to fill the keyword index
+    indexed = keyword_index.indexed_chunk_ids(filename)
+    unchanged = manifest is not None and manifest["file_hash"] == file_hash and manifest["chunking"] == strategy
+
+    if unchanged and indexed:
+        if on_progress:
+            on_progress(0, 0)
+        if before_commit:
+            before_commit()
+        catalog_service.record(filename, os.path.getsize(file_path), manifest["chunk_count"], file_hash)
+        return manifest["chunk_count"]
 
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    base_id = _generate_doc_id(filename)
 
-    return text
+    if manifest is not None:
+        existing = manifest["chunks"]
+    else:
+        # No manifest yet (e.g. ingested before manifests existed): treat every
+        # stored vector as stale so it is replaced.
+        existing = {doc_id: None for doc_id in list_ids_by_filename(base_id)}
 
+    chunk_ids = []
+    seen = {}
+    pending = []
+    moved = []
+    keywords = []
+    embedded = 0
 
-def _extract_text_from_docx(file_path: str) -> str:
-    """Extract text from a DOCX file."""
-    doc = Document(file_path)
-    text = ""
+    # Vectors and keyword entries added by this run, discarded if it fails
+    added_vectors = []
+    added_keywords = []
 
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
+    def store_pending() -> int:
+        added_vectors.extend(doc_id for doc_id, _, _ in pending)
+        return upsert_documents(pending)
 
-    return text
+    def store_keywords() -> None:
+        added_keywords.extend(doc_id for doc_id, _, _, _ in keywords)
+        keyword_index.add_chunks(keywords)
 
+    chunker = get_chunker(strategy, filename)
 
-def _extract_text_from_txt(file_path: str) -> str:
-    """Extract text from a TXT or MD file."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
+    try:
+        # Extraction and chunking are interleaved; time each by the time spent producing items
+        text = metrics.TimedIterator(iter_text(file_path))
+        chunks = metrics.TimedIterator(chunker.split(text))
 
+        for i, chunk in enumerate(chunks):
+            doc_id = _generate_chunk_id(base_id, chunk, seen)
+            chunk_ids.append(doc_id)
 
-def _extract_text(file_path: str) -> str:
-    """Extract text from a file based on its extension."""
-    lower_path = file_path.lower()
+            if doc_id not in existing:
+                pending.append((doc_id, chunk, {"filename": filename, "chunk_index": i}))
+            elif existing[doc_id] != i:
+                moved.append((doc_id, {"chunk_index": i}))
 
-    if lower_path.endswith(".pdf"):
-        return _extract_text_from_pdf(file_path)
-    elif lower_path.endswith(".docx"):
-        return _extract_text_from_docx(file_path)
-    elif lower_path.endswith(".txt") or lower_path.endswith(".md"):
-        return _extract_text_from_txt(file_path)
-    else:
-        raise ValueError(f"Unsupported file format. Allowed: {ALLOWED_EXTENSIONS}")
+            if doc_id not in indexed:
+                keywords.append((doc_id, filename, i, chunk))
 
+            if len(pending) >= settings.embedding_batch_size:
+                embedded += store_pending()
+                pending = []
+                if on_progress:
+                    on_progress(embedded, None)
 
-def _split_into_chunks(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
-    """Split text into overlapping chunks."""
-    chunks = []
-    start = 0
+            if len(keywords) >= settings.embedding_batch_size:
+                store_keywords()
+                keywords = []
 
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
+        metrics.observe("ingest", "extract", text.seconds)
+        metrics.observe("ingest", "chunk", chunks.seconds - text.seconds)
 
-        if chunk.strip():
-            chunks.append(chunk.strip())
+        if not chunk_ids:
+            raise ValueError("Could not extract text from document")
 
-        start = end - overlap
+        embedded += store_pending()
+        if on_progress:
+            on_progress(embedded, embedded)
 
-    return chunks
+        store_keywords()
 
+        if before_commit:
+            before_commit()
 
-def process_document(filename: str, file_path: str) -> int:
-    """Process a document: extract text, chunk it, and store in Pinecone."""
-    text = _extract_text(file_path)
+    except BaseException:
+        _discard_chunks(added_vectors, added_keywords)
+        raise
 
-    if not text.strip():
-        raise ValueError("Could not extract text from document")
+    current = set(chunk_ids)
+    update_metadata(moved)
+    keyword_index.update_positions(moved)
+    delete_by_ids([doc_id for doc_id in existing if doc_id not in current])
+    keyword_index.delete_chunks([doc_id for doc_id in indexed if doc_id not in current])
+    save_manifest(filename, file_hash, strategy, chunk_ids)
+    catalog_service.record(filename, os.path.getsize(file_path), len(chunk_ids), file_hash)
+    answer_cache.invalidate(filename)
 
-    chunks = _split_into_chunks(text)
-    base_id = _generate_doc_id(filename)
+    return len(chunk_ids)
 
-    for i, chunk in enumerate(chunks):
-        doc_id = f"{base_id}_{i}"
-        metadata = {
-            "filename": filename,
-            "chunk_index": i,
-            "total_chunks": len(chunks)
-        }
-        upsert_document(doc_id, chunk, metadata)
 
-    return len(chunks)
+async def process_document_async(filename: str, file_path: str, chunking: str = "auto") -> int:
+    """Async variant of `process_document`. Ingestion runs in a worker thread."""
+    return await asyncio.to_thread(process_document, filename, file_path, None, chunking)
 
 
 def delete_document_by_filename(filename: str) -> int:
-    """Delete all chunks of a document from Pinecone."""
+    """Delete all chunks of a document from Pinecone and the keyword index."""
     base_id = _generate_doc_id(filename)
     ids = list_ids_by_filename(base_id)
+    delete_manifest(filename)
+    catalog_service.remove([filename])
+    keyword_index.delete_document(filename)
 
-    if not ids:
-        return 0
+    if ids:
+        delete_by_ids(ids)
 
-    delete_by_ids(ids)
+    # Only once the vectors are gone, so answers retrieved meanwhile aren't cached
+    answer_cache.invalidate(filename)
 
     return len(ids)
+
+
+async def delete_document_by_filename_async(filename: str) -> int:
+    """Delete all chunks of a document from a worker thread."""
+    return await asyncio.to_thread(delete_document_by_filename, filename)
+
+
+def delete_documents_by_filename(filenames: list[str]) -> dict[str, int]:
+    """
+    Delete the chunks of many documents.
+
+    Vector IDs are listed concurrently for all documents, then deleted in
+    batches of `delete_batch_size` instead of one request per document.
+
+    Returns:
+        Number of chunks deleted per filename
+    """
+    ids_by_base_id = list_ids_by_filenames([_generate_doc_id(filename) for filename in filenames])
+
+    catalog_service.remove(filenames)
+
+    for filename in filenames:
+        delete_manifest(filename)
+        keyword_index.delete_document(filename)
+
+    delete_by_ids([doc_id for ids in ids_by_base_id.values() for doc_id in ids])
+
+    # Only once the vectors are gone, so answers retrieved meanwhile aren't cached
+    for filename in filenames:
+        answer_cache.invalidate(filename)
+
+    return {filename: len(ids_by_base_id[_generate_doc_id(filename)]) for filename in filenames}
+
+
+async def delete_documents_by_filename_async(filenames: list[str]) -> dict[str, int]:
+    """Delete the chunks of many documents from a worker thread."""
+    return await asyncio.to_thread(delete_documents_by_filename, filenames)
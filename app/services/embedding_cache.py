@@ -0,0 +1,233 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from app.config import settings
+
+
+def _cache_key(model: str, text: str) -> str:
+    """Cache key for an embedding: model name plus sha256 of the text."""
+    return f"{model}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+
+class EmbeddingCache:
+    """
+    Base class for embedding caches.
+
+    Subclasses implement `_get` and `_set` over already-hashed keys; this
+    class handles key derivation and hit/miss accounting.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Look up embeddings for texts. Missing entries are returned as None."""
+        found = self._get([_cache_key(model, text) for text in texts])
+        hits = sum(1 for embedding in found if embedding is not None)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        return found
+
+    def set_many(self, model: str, texts: list[str], embeddings: list[list[float]]) -> None:
+        """Store embeddings for texts."""
+        self._set([_cache_key(model, text) for text in texts], embeddings)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _get(self, keys: list[str]) -> list[list[float] | None]:
+        raise NotImplementedError
+
+    def _set(self, keys: list[str], embeddings: list[list[float]]) -> None:
+        raise NotImplementedError
+
+
+class NullEmbeddingCache(EmbeddingCache):
+    """Cache that never stores anything."""
+
+    def _get(self, keys):
+        return [None] * len(keys)
+
+    def _set(self, keys, embeddings):
+        pass
+
+
+class MemoryEmbeddingCache(EmbeddingCache):
+    """In-process LRU cache holding vectors as compact float32 arrays."""
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, keys):
+        found = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    found.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    found.append(vector.tolist())
+
+        return found
+
+    def _set(self, keys, embeddings):
+        with self._lock:
+            for key, embedding in zip(keys, embeddings):
+                self._entries[key] = array("f", embedding)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {**super().stats(), "entries": len(self._entries)}
+
+
+class SQLiteEmbeddingCache(EmbeddingCache):
+    """
+    On-disk cache storing float32 vectors in SQLite.
+
+    When the number of entries exceeds `max_entries`, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _get(self, keys):
+        if not keys:
+            return []
+
+        with self._lock:
+            rows = {}
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall())
+
+            if rows:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in rows]
+                )
+                self._conn.commit()
+
+        found = []
+        for key in keys:
+            blob = rows.get(key)
+            found.append(array("f", blob).tolist() if blob is not None else None)
+        return found
+
+    def _set(self, keys, embeddings):
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, array("f", embedding).tobytes(), now) for key, embedding in zip(keys, embeddings)]
+            )
+            self._count += max(cursor.rowcount, 0)
+
+            if self._count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (self._count - self.max_entries,)
+                )
+                self._count = self.max_entries
+
+            self._conn.commit()
+
+    def stats(self):
+        return {**super().stats(), "entries": self._count}
+
+
+class TieredEmbeddingCache(EmbeddingCache):
+    """In-process LRU in front of an on-disk cache. Disk hits are promoted to memory."""
+
+    def __init__(self, memory: MemoryEmbeddingCache, disk: SQLiteEmbeddingCache):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def _get(self, keys):
+        found = self.memory._get(keys)
+        missing = [i for i, embedding in enumerate(found) if embedding is None]
+        self.memory.hits += len(keys) - len(missing)
+        self.memory.misses += len(missing)
+
+        if missing:
+            from_disk = self.disk._get([keys[i] for i in missing])
+            promoted_keys = []
+            promoted = []
+
+            for i, embedding in zip(missing, from_disk):
+                if embedding is not None:
+                    found[i] = embedding
+                    promoted_keys.append(keys[i])
+                    promoted.append(embedding)
+
+            self.disk.hits += len(promoted)
+            self.disk.misses += len(missing) - len(promoted)
+            self.memory._set(promoted_keys, promoted)
+
+        return found
+
+    def _set(self, keys, embeddings):
+        self.memory._set(keys, embeddings)
+        self.disk._set(keys, embeddings)
+
+    def stats(self):
+        return {**super().stats(), "memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+def create_embedding_cache() -> EmbeddingCache:
+    """Build the embedding cache selected by `settings.embedding_cache`."""
+    backend = settings.embedding_cache
+
+    if backend == "none":
+        return NullEmbeddingCache()
+
+    memory = MemoryEmbeddingCache(settings.embedding_cache_memory_entries)
+
+    if backend == "memory":
+        return memory
+
+    if backend == "tiered":
+        disk = SQLiteEmbeddingCache(settings.embedding_cache_path, settings.embedding_cache_disk_entries)
+        return TieredEmbeddingCache(memory, disk)
+
+    raise ValueError(f"Unknown embedding cache backend: {backend}")
@@ -1,16 +1,203 @@
-from openai import OpenAI
+import asyncio
+import threading
 from app.config import settings
+from app.services import clients, coalescing, metrics, rate_limiter
+from app.services.embedding_cache import create_embedding_cache
 
-client = OpenAI(api_key=settings.openai_api_key)
+_cache = None
+_cache_lock = threading.Lock()
 
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+
+
+def embedding_dimension() -> int:
+    """Dimension of the embeddings, reduced by `embedding_dimensions` if set."""
+    return settings.embedding_dimensions or EMBEDDING_DIMENSIONS
+
+
+def _request_options() -> dict:
+    """Model arguments of embedding requests."""
+    if settings.embedding_dimensions:
+        return {"model": EMBEDDING_MODEL, "dimensions": settings.embedding_dimensions}
+    return {"model": EMBEDDING_MODEL}
+
+
+def _cache_key() -> str:
+    # Reduced embeddings are cached apart from full ones
+    if settings.embedding_dimensions:
+        return f"{EMBEDDING_MODEL}:{settings.embedding_dimensions}"
+    return EMBEDDING_MODEL
+
+
+def _estimate_tokens(text: str) -> int:
+    """Conservative token estimate (~3 characters per token)."""
+    return len(text) // 3 + 1
+
+
+def _iter_batches(texts: list[str]):
+    """Group texts into batches bounded by input count and estimated tokens."""
+    batch = []
+    batch_tokens = 0
+
+    for text in texts:
+        tokens = _estimate_tokens(text)
+
+        if batch and (
+            len(batch) >= settings.embedding_batch_size
+            or batch_tokens + tokens > settings.embedding_batch_max_tokens
+        ):
+            yield batch
+            batch = []
+            batch_tokens = 0
+
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch
+
+
+def _get_cache():
+    """The embedding cache, opened on first use."""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_embedding_cache()
+
+    return _cache
+
+
+def _lookup_cached(texts: list[str]) -> tuple[list, list[str]]:
+    """Return cached embeddings (None where missing) and the unique texts to embed."""
+    found = _get_cache().get_many(_cache_key(), texts)
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, found) if embedding is None))
+    return found, missing
+
+
+def _store_cached(texts: list[str], embeddings: list[list[float]]) -> None:
+    _get_cache().set_many(_cache_key(), texts, embeddings)
+
+
+def _fill_missing(texts: list[str], found: list, missing: list[str], embeddings: list[list[float]]) -> list[list[float]]:
+    """Store fresh embeddings in the cache and merge them into the results."""
+    _store_cached(missing, embeddings)
+    fresh = dict(zip(missing, embeddings))
+    return [embedding if embedding is not None else fresh[text] for text, embedding in zip(texts, found)]
+
+
+def _count_usage(response, estimated: int) -> None:
+    """Count the tokens used and correct the rate limiter's estimate."""
+    used = getattr(getattr(response, "usage", None), "total_tokens", None)
+    metrics.count_tokens("embedding", used)
+    if used is not None:
+        rate_limiter.openai.tokens.adjust(used - estimated)
+
 
 def generate_embedding(text: str) -> list[float]:
     """
     Embeds a text using the OpenAI API.
     """
-    response = client.embeddings.create(
-        input=text,
-        model=EMBEDDING_MODEL
-    )
-    return response.data[0].embedding
\ No newline at end of file
+    return generate_embeddings([text])[0]
+
+
+def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """
+    Embeds many texts using the list-input form of the OpenAI API.
+
+    Cached embeddings are reused and duplicate texts are embedded once. The
+    rest are sent in batches of at most `embedding_batch_size` inputs and
+    `embedding_batch_max_tokens` estimated tokens. Results keep input order.
+    """
+    found, missing = _lookup_cached(texts)
+
+    if not missing:
+        return found
+
+    embeddings = []
+
+    for batch in _iter_batches(missing):
+        estimated = sum(_estimate_tokens(text) for text in batch)
+        response = rate_limiter.openai.call(
+            clients.openai_client().embeddings.create,
+            input=batch,
+            tokens=estimated,
+            **_request_options()
+        )
+        _count_usage(response, estimated)
+        data = sorted(response.data, key=lambda item: item.index)
+        embeddings.extend(item.embedding for item in data)
+
+    return _fill_missing(texts, found, missing, embeddings)
+
+
+async def _embed_missing_async(texts: list[str]) -> list[list[float]]:
+    """Embed texts that aren't cached, in batches, with the async client."""
+    embeddings = []
+
+    for batch in _iter_batches(texts):
+        estimated = sum(_estimate_tokens(text) for text in batch)
+        response = await rate_limiter.openai.call_async(
+            clients.async_openai_client().embeddings.create,
+            input=batch,
+            tokens=estimated,
+            **_request_options()
+        )
+        _count_usage(response, estimated)
+        data = sorted(response.data, key=lambda item: item.index)
+        embeddings.extend(item.embedding for item in data)
+
+    return embeddings
+
+
+async def _embed_batch_async(texts: list[str]) -> list[list[float]]:
+    """Embed the texts of one micro-batch and cache them."""
+    missing = list(dict.fromkeys(texts))
+    fresh = dict(zip(missing, await _embed_missing_async(missing)))
+    # The cache may hit SQLite and wait for ingestion threads, so it is used off the event loop
+    await asyncio.to_thread(_store_cached, missing, [fresh[text] for text in missing])
+    return [fresh[text] for text in texts]
+
+
+_flights = coalescing.SingleFlight("embedding")
+_batcher = coalescing.MicroBatcher(
+    "embedding", _embed_batch_async, settings.embedding_batch_window_ms / 1000, settings.embedding_batch_size
+)
+
+
+async def generate_embedding_async(text: str) -> list[float]:
+    """
+    Embeds a text using the async OpenAI client.
+
+    Concurrent calls are coalesced: identical texts share one request and
+    distinct texts are sent together in micro-batches.
+    """
+    found, missing = await asyncio.to_thread(_lookup_cached, [text])
+
+    if not missing:
+        return found[0]
+
+    if not settings.coalesce_requests:
+        return (await _embed_batch_async([text]))[0]
+
+    return await _flights.run(text, lambda: _batcher.submit(text))
+
+
+async def generate_embeddings_async(texts: list[str]) -> list[list[float]]:
+    """
+    Async variant of `generate_embeddings`.
+    """
+    found, missing = await asyncio.to_thread(_lookup_cached, texts)
+
+    if not missing:
+        return found
+
+    embeddings = await _embed_missing_async(missing)
+    return await asyncio.to_thread(_fill_missing, texts, found, missing, embeddings)
+
+
+def cache_stats() -> dict:
+    """Hit/miss metrics for the embedding cache."""
+    return _get_cache().stats()
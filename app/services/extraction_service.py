@@ -0,0 +1,116 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from app.config import settings
+
+
+ALLOWED_EXTENSIONS = {".pdf", ".docx", ".txt", ".md"}
+
+# Size of the blocks read from TXT/MD files
+_TEXT_BLOCK_SIZE = 64 * 1024
+
+_pool = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool for PDF page extraction, created on first use."""
+    global _pool
+
+    if _pool is None:
+        # "spawn" avoids forking a process that is running worker threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.pdf_extraction_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    return _pool
+
+
+def load_parsers() -> None:
+    """Import the PDF and DOCX libraries, which are otherwise loaded by the first upload."""
+    import docx  # noqa: F401
+    import pypdf  # noqa: F401
+
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> list[str]:
+    """Extract the text of pages [start, end) of a PDF. Runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _iter_text_from_pdf(file_path: str):
+    """
+    Yield the text of a PDF page by page.
+
+    Large PDFs are split into page ranges that are extracted by a process
+    pool. Only a small window of ranges is in flight at a time, so memory
+    stays bounded regardless of page count.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+
+    if page_count < settings.pdf_parallel_min_pages or settings.pdf_extraction_workers < 2:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    per_task = settings.pdf_pages_per_task
+    ranges = ((start, min(start + per_task, page_count)) for start in range(0, page_count, per_task))
+    pool = _get_pool()
+    pending = deque(
+        pool.submit(_extract_pdf_pages, file_path, start, end)
+        for start, end in islice(ranges, 2 * settings.pdf_extraction_workers)
+    )
+
+    while pending:
+        pages = pending.popleft().result()
+
+        next_range = next(ranges, None)
+        if next_range is not None:
+            pending.append(pool.submit(_extract_pdf_pages, file_path, *next_range))
+
+        yield from pages
+
+
+def _iter_text_from_docx(file_path: str):
+    """Yield the text of a DOCX file paragraph by paragraph."""
+    from docx import Document
+
+    doc = Document(file_path)
+
+    for paragraph in doc.paragraphs:
+        yield paragraph.text + "\n"
+
+
+def _iter_text_from_txt(file_path: str):
+    """Yield the text of a TXT or MD file in blocks."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        yield from iter(lambda: f.read(_TEXT_BLOCK_SIZE), "")
+
+
+def iter_text(file_path: str):
+    """Yield the text of a file in pieces, based on its extension."""
+    lower_path = file_path.lower()
+
+    if lower_path.endswith(".pdf"):
+        return _iter_text_from_pdf(file_path)
+    elif lower_path.endswith(".docx"):
+        return _iter_text_from_docx(file_path)
+    elif lower_path.endswith(".txt") or lower_path.endswith(".md"):
+        return _iter_text_from_txt(file_path)
+    else:
+        raise ValueError(f"Unsupported file format. Allowed: {ALLOWED_EXTENSIONS}")
+
+
+def shutdown() -> None:
+    """Stop the PDF extraction process pool, if it was started."""
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,137 @@
+import threading
+import httpx
+
+
+class PoolStats:
+    """
+    Request and connection counters of one HTTP connection pool.
+
+    A request is in flight from the moment it is sent until its response
+    is closed. Connection reuse is the share of requests that didn't open
+    a new connection; saturation is in-flight requests over the pool size.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.requests = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_connections": self.max_connections,
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections_opened": self.connections_opened,
+                "connection_reuse": 1 - self.connections_opened / self.requests if self.requests else None,
+                "saturation": self.in_flight / self.max_connections,
+            }
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class CountingTransport(httpx.BaseTransport):
+    """Transport that records requests and new connections in a `PoolStats`."""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats.connection_opened()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.started()
+        request.extensions["trace"] = self._trace
+
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._stats.finished()
+            raise
+
+        response.stream = _TrackedStream(response.stream, self._stats.finished)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """Async variant of `CountingTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats.connection_opened()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.started()
+        request.extensions["trace"] = self._trace
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._stats.finished()
+            raise
+
+        response.stream = _AsyncTrackedStream(response.stream, self._stats.finished)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
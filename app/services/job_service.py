@@ -0,0 +1,280 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from app.config import settings
+from app.services import metrics
+from app.services.document_service import process_document
+
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_COLUMNS = (
+    "id", "filename", "file_path", "chunking", "status", "chunks_total", "chunks_embedded",
+    "chunks_created", "error", "created_at", "started_at", "finished_at",
+)
+
+_lock = threading.Lock()
+_conn = None
+_executor = None
+_upload_executor = None
+
+# Jobs of the same document run one at a time, in submission order: the
+# first job ID of each list is queued on the pool or running
+_document_jobs = {}
+_document_jobs_lock = threading.Lock()
+
+
+def _connection() -> sqlite3.Connection:
+    """Open the jobs database on first use."""
+    global _conn
+
+    if _conn is None:
+        os.makedirs(os.path.dirname(settings.jobs_path) or ".", exist_ok=True)
+        _conn = sqlite3.connect(settings.jobs_path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "chunking TEXT NOT NULL DEFAULT 'auto', status TEXT NOT NULL, "
+            "chunks_total INTEGER, chunks_embedded INTEGER NOT NULL DEFAULT 0, "
+            "chunks_created INTEGER, error TEXT, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL)"
+        )
+        columns = {row[1] for row in _conn.execute("PRAGMA table_info(jobs)")}
+        if "chunking" not in columns:
+            _conn.execute("ALTER TABLE jobs ADD COLUMN chunking TEXT NOT NULL DEFAULT 'auto'")
+
+    return _conn
+
+
+def _update(job_id: str, **fields) -> None:
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ingestion_workers,
+            thread_name_prefix="ingestion"
+        )
+
+    return _executor
+
+
+def _get_upload_executor() -> ThreadPoolExecutor:
+    """Threads that upload staged files to R2 while their job is processed."""
+    global _upload_executor
+
+    if _upload_executor is None:
+        _upload_executor = ThreadPoolExecutor(
+            max_workers=settings.ingestion_workers,
+            thread_name_prefix="r2-upload"
+        )
+
+    return _upload_executor
+
+
+def _store(file_path: str, key: str) -> None:
+    from app.services import storage_service
+
+    with metrics.span("ingest", "store", "r2"):
+        storage_service.upload_file(file_path, key)
+
+
+def _schedule(job_id: str, filename: str) -> None:
+    """Queue a job on the pool, or behind the jobs of the same document that are not finished."""
+    with _document_jobs_lock:
+        jobs = _document_jobs.setdefault(filename, [])
+        jobs.append(job_id)
+        if len(jobs) > 1:
+            return
+
+    _get_executor().submit(_run, job_id)
+
+
+def _schedule_next(filename: str) -> None:
+    """Queue the next job of a document once the current one has finished."""
+    with _document_jobs_lock:
+        jobs = _document_jobs[filename]
+        jobs.pop(0)
+        if not jobs:
+            del _document_jobs[filename]
+            return
+        next_job_id = jobs[0]
+
+    try:
+        _get_executor().submit(_run, next_job_id)
+    except RuntimeError:
+        # Shutting down: the job stays queued and is resumed by the next start
+        pass
+
+
+def _discard_upload(key: str) -> None:
+    from app.services import storage_service
+
+    try:
+        storage_service.delete_file(key)
+    except Exception:
+        logger.exception("Could not delete partial upload %s", key)
+
+
+def _cleanup(file_path: str) -> None:
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def _run(job_id: str) -> None:
+    """Run a job, then queue the next job of the same document."""
+    job = get_job(job_id)
+
+    try:
+        _ingest(job)
+    finally:
+        _schedule_next(job["filename"])
+
+
+def _ingest(job: dict) -> None:
+    """
+    Run one ingestion job: process the file and, if R2 is configured, store it there.
+
+    The R2 upload runs at the same time as extraction and embedding, so a
+    job takes about as long as the slower of the two instead of their sum.
+    The file is uploaded to a temporary key and moved to its own key once
+    every new chunk is stored. If either half fails, the temporary object
+    and the chunks the job added are deleted, and the previous version of
+    the document is still served and searchable.
+    """
+    from app.services import storage_service
+
+    job_id = job["id"]
+    _update(job_id, status=RUNNING, started_at=time.time(), error=None)
+
+    def on_progress(embedded: int, total: int) -> None:
+        _update(job_id, chunks_embedded=embedded, chunks_total=total)
+
+    upload = None
+    before_commit = None
+
+    if settings.use_r2_storage:
+        key = storage_service.partial_key(job["filename"], job_id)
+        upload = _get_upload_executor().submit(_store, job["file_path"], key)
+
+        def before_commit() -> None:
+            upload.result()
+            with metrics.span("ingest", "store", "r2"):
+                storage_service.move_file(key, job["filename"])
+
+    try:
+        try:
+            chunks_created = process_document(
+                job["filename"], job["file_path"], on_progress, job["chunking"], before_commit
+            )
+        finally:
+            # The staged file can only be removed once the upload is done reading it
+            if upload is not None:
+                wait([upload])
+
+        if upload is not None:
+            _cleanup(job["file_path"])
+        _update(job_id, status=SUCCEEDED, chunks_created=chunks_created, finished_at=time.time())
+
+    except Exception as e:
+        if upload is not None:
+            _discard_upload(key)
+        _cleanup(job["file_path"])
+        _update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+
+
+def submit(filename: str, file_path: str, chunking: str = "auto") -> dict:
+    """
+    Queue a stored file for ingestion.
+
+    Args:
+        filename: Name the document is stored under
+        file_path: Local path of the stored file. For R2 storage this is a
+            staging copy that is uploaded and removed once processed.
+        chunking: Chunking strategy name, or "auto"
+
+    Returns:
+        The new job
+    """
+    job_id = uuid.uuid4().hex
+
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, filename, file_path, chunking, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, filename, file_path, chunking, QUEUED, time.time())
+            )
+
+    _schedule(job_id, filename)
+
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> dict | None:
+    """Get a job by ID, or None if it doesn't exist."""
+    with _lock:
+        row = _connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+    return dict(zip(_COLUMNS, row)) if row else None
+
+
+def start() -> None:
+    """
+    Start the worker pool and resume jobs interrupted by a restart.
+
+    Jobs that were queued or running are queued again if their file is
+    still available, otherwise they are marked as failed.
+    """
+    with _lock:
+        rows = _connection().execute(
+            "SELECT id, filename, file_path FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (QUEUED, RUNNING)
+        ).fetchall()
+
+    for job_id, filename, file_path in rows:
+        if os.path.exists(file_path):
+            _update(job_id, status=QUEUED, started_at=None)
+            _schedule(job_id, filename)
+        else:
+            _update(job_id, status=FAILED, error="Interrupted by a restart and the file is no longer available",
+                    finished_at=time.time())
+
+
+def shutdown() -> None:
+    """Stop accepting jobs and wait for running ones to finish."""
+    global _executor, _upload_executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+    # Queued jobs are resumed by the next start
+    with _document_jobs_lock:
+        _document_jobs.clear()
+
+    if _upload_executor is not None:
+        _upload_executor.shutdown(wait=True)
+        _upload_executor = None
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from app.config import settings
+from app.services import metrics
+
+
+# Longest keyword query sent to the index; longer questions keep their first terms
+_MAX_QUERY_TERMS = 32
+
+_TERM = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _connection() -> sqlite3.Connection:
+    """
+    Open the keyword index on first use.
+
+    Chunk texts live in `chunks`; `chunks_fts` is an SQLite FTS5 inverted
+    index over them, kept in sync by triggers and ranked with BM25.
+    """
+    global _conn
+
+    if _conn is None:
+        os.makedirs(os.path.dirname(settings.keyword_index_path) or ".", exist_ok=True)
+        _conn = sqlite3.connect(settings.keyword_index_path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, filename TEXT NOT NULL, "
+            "chunk_index INTEGER NOT NULL, text TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS chunks_filename ON chunks (filename);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+            "text, content='chunks', content_rowid='id', tokenize='unicode61 remove_diacritics 2');"
+            "CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN "
+            "INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text); END;"
+            "CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN "
+            "INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text); END;"
+        )
+
+    return _conn
+
+
+def indexed_chunk_ids(filename: str) -> set[str]:
+    """IDs of the chunks of a document that are in the keyword index."""
+    with _lock:
+        rows = _connection().execute("SELECT chunk_id FROM chunks WHERE filename = ?", (filename,)).fetchall()
+
+    return {row[0] for row in rows}
+
+
+def add_chunks(chunks: list[tuple[str, str, int, str]]) -> None:
+    """
+    Index chunks given as (chunk_id, filename, chunk_index, text) tuples.
+
+    Chunk IDs are derived from the chunk content, so chunks that are already
+    indexed are skipped.
+    """
+    if not chunks:
+        return
+
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_id, filename, chunk_index, text) VALUES (?, ?, ?, ?)",
+                chunks
+            )
+
+
+def update_positions(updates: list[tuple[str, dict]]) -> None:
+    """Apply `chunk_index` changes given as (chunk_id, metadata) tuples."""
+    if not updates:
+        return
+
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany(
+                "UPDATE chunks SET chunk_index = ? WHERE chunk_id = ?",
+                [(metadata["chunk_index"], chunk_id) for chunk_id, metadata in updates]
+            )
+
+
+def delete_chunks(chunk_ids: list[str]) -> None:
+    """Remove chunks from the index."""
+    if not chunk_ids:
+        return
+
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+
+
+def delete_document(filename: str) -> None:
+    """Remove every chunk of a document from the index."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute("DELETE FROM chunks WHERE filename = ?", (filename,))
+
+
+def _match_query(query: str) -> str | None:
+    """Turn free text into an FTS5 query matching any of its terms."""
+    terms = list(dict.fromkeys(term.lower() for term in _TERM.findall(query)))[:_MAX_QUERY_TERMS]
+
+    if not terms:
+        return None
+
+    # Quoted terms are matched literally, so FTS5 operators in the question have no effect
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def search(query: str, top_k: int = 5) -> list[dict]:
+    """
+    Rank chunks by BM25 relevance to a query.
+
+    Returns:
+        List of documents shaped like vector search results: id, score
+        (BM25, higher is better) and metadata with filename, chunk_index and text
+    """
+    match = _match_query(query)
+
+    if match is None:
+        return []
+
+    with metrics.span("chat", "keyword_query"), _lock:
+        rows = _connection().execute(
+            "SELECT chunks.chunk_id, chunks.filename, chunks.chunk_index, chunks.text, bm25(chunks_fts) "
+            "FROM chunks_fts JOIN chunks ON chunks.id = chunks_fts.rowid "
+            "WHERE chunks_fts MATCH ? ORDER BY bm25(chunks_fts) LIMIT ?",
+            (match, top_k)
+        ).fetchall()
+
+    return [
+        {
+            "id": chunk_id,
+            "score": -rank,
+            "metadata": {"filename": filename, "chunk_index": chunk_index, "text": text}
+        }
+        for chunk_id, filename, chunk_index, text, rank in rows
+    ]
+
+
+async def search_async(query: str, top_k: int = 5) -> list[dict]:
+    """Async variant of `search`. The query runs in a worker thread."""
+    return await asyncio.to_thread(search, query, top_k)
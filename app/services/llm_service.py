@@ -1,104 +1,340 @@
-from openai import OpenAI
+import asyncio
+import time
 from app.config import settings
-from app.services.pinecone_service import search_documents
+from app.services import answer_cache, clients, coalescing, metrics, rate_limiter, tokenizer
+from app.services.context_service import build_context, pack_context
+from app.services.embedding_service import generate_embedding, generate_embedding_async, generate_embeddings_async
+from app.services.retrieval_service import retrieve, retrieve_async
 
 
-# OpenAI client instance
-_client = OpenAI(api_key=settings.openai_api_key)
+NO_DOCUMENTS_ANSWER = "I couldn't find any relevant information in the documents."
 
+# Concurrent identical questions share one answer
+_answer_flights = coalescing.SingleFlight("answer")
 
-def build_context(documents: list[dict]) -> str:
-    """
-    Build a context string from retrieved documents.
 
-    Args:
-        documents: List of documents from Pinecone search
+def _build_messages(question: str, documents: list[dict]) -> list[dict]:
+    """Build the chat messages for a question and its retrieved documents."""
+    context = build_context(documents)
 
-    Returns:
-        Formatted context string
-    """
-    context_parts = []
+    system_prompt = """You are a helpful assistant that answers questions based on the provided documents.
+
+Rules:
+1. Only answer based on the information in the documents
+2. If the information is not in the documents, say "I don't have this information in the documents"
+3. Be specific and cite which document the information comes from
+4. Be concise but complete
+5. If there are monetary values, dates, or names, include them exactly as they appear"""
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Documents:\n{context}\n\nQuestion: {question}"}
+    ]
 
-    for i, doc in enumerate(documents, 1):
+
+def _format_sources(documents: list[dict]) -> list[dict]:
+    """Turn retrieved documents into the sources returned to the client."""
+    sources = []
+    for doc in documents:
         metadata = doc.get("metadata", {})
-        text = metadata.get("text", "")
-        filename = metadata.get("filename", "unknown")
+        sources.append({
+            "filename": metadata.get("filename", "unknown"),
+            "chunk_index": metadata.get("chunk_index", 0),
+            "score": doc.get("score", 0.0),
+            "text": metadata.get("text", "")[:200] + "..."
+        })
+    return sources
+
+
+def _pack(documents: list[dict]) -> tuple[list[dict], list[dict], dict]:
+    """Pack retrieved documents into the context; returns (packed, sources, context stats)."""
+    with metrics.span("chat", "context_build"):
+        packed, stats = pack_context(documents)
+    sources = _format_sources([chunk for span in packed for chunk in span["chunks"]])
+    return packed, sources, stats
+
+
+def _count_usage(usage) -> None:
+    if usage is not None:
+        metrics.count_tokens("prompt", usage.prompt_tokens)
+        metrics.count_tokens("completion", usage.completion_tokens)
+        # The prompt was charged to the tokens-per-minute limit before the call
+        rate_limiter.openai.tokens.adjust(usage.completion_tokens)
+
+
+def _complete(messages: list[dict]):
+    """Run a completion, timing it and counting its tokens."""
+    with metrics.span("chat", "llm_total", "openai"):
+        response = _create_completion(messages)
+    _count_usage(getattr(response, "usage", None))
+    return response
+
+
+async def _complete_async(messages: list[dict]):
+    """Async variant of `_complete`."""
+    with metrics.span("chat", "llm_total", "openai"):
+        response = await _create_completion_async(messages)
+    _count_usage(getattr(response, "usage", None))
+    return response
+
 
-        context_parts.append(
-            f"[Document {i} - {filename}]\n{text}"
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(tokenizer.count_tokens(message["content"]) for message in messages)
+
+
+def _create_completion(messages: list[dict]):
+    """
+    Call the chat completions API within the OpenAI rate limits, retrying
+    without temperature if unsupported.
+    """
+    create = clients.openai_client().chat.completions.create
+    tokens = _prompt_tokens(messages)
+
+    try:
+        return rate_limiter.openai.call(
+            create,
+            model=settings.openai_model,
+            messages=messages,
+            temperature=0.3,
+            tokens=tokens
         )
+    except Exception as e:
+        if "temperature" in str(e):
+            return rate_limiter.openai.call(
+                create,
+                model=settings.openai_model,
+                messages=messages,
+                tokens=tokens
+            )
+        raise e
 
-    return "\n\n".join(context_parts)
+
+async def _create_completion_async(messages: list[dict], **kwargs):
+    """Async variant of `_create_completion`. Extra kwargs (e.g. `stream`) are passed through."""
+    create = clients.async_openai_client().chat.completions.create
+    tokens = _prompt_tokens(messages)
+
+    try:
+        return await rate_limiter.openai.call_async(
+            create,
+            model=settings.openai_model,
+            messages=messages,
+            temperature=0.3,
+            tokens=tokens,
+            **kwargs
+        )
+    except Exception as e:
+        if "temperature" in str(e):
+            return await rate_limiter.openai.call_async(
+                create,
+                model=settings.openai_model,
+                messages=messages,
+                tokens=tokens,
+                **kwargs
+            )
+        raise e
 
 
 def generate_answer(question: str, max_results: int = 10) -> dict:
     """
     Generate an answer using RAG (Retrieval Augmented Generation).
 
-    1. Search for relevant documents
-    2. Build context from documents
-    3. Send to LLM to generate answer
+    1. Embed the question and check the semantic answer cache
+    2. Search for relevant documents (vector and keyword search)
+    3. Pack the documents into a context within the token budget
+    4. Send to LLM to generate answer
 
     Args:
         question: The user's question
         max_results: Number of documents to retrieve
 
     Returns:
-        Dictionary with answer and sources
+        Dictionary with answer, sources, context statistics (see
+        `context_service.pack_context`) and whether it came from the cache
     """
+    with metrics.span("chat", "embed", "openai"):
+        embedding = generate_embedding(question)
+
+    cached = answer_cache.lookup(embedding, max_results)
+    if cached is not None:
+        return {**cached, "cached": True}
 
-    documents = search_documents(question, max_results)
+    version = answer_cache.version()
+    documents = retrieve(question, embedding, max_results)
 
     if not documents:
         return {
-            "answer": "I couldn't find any relevant information in the documents.",
-            "sources": []
+            "answer": NO_DOCUMENTS_ANSWER,
+            "sources": [],
+            "context": None,
+            "cached": False
         }
 
-    context = build_context(documents)
+    packed, sources, context = _pack(documents)
+    response = _complete(_build_messages(question, packed))
 
-    system_prompt = """You are a helpful assistant that answers questions based on the provided documents.
+    result = {
+        "answer": response.choices[0].message.content,
+        "sources": sources,
+        "context": context
+    }
+    answer_cache.store(embedding, max_results, result, version)
 
-Rules:
-1. Only answer based on the information in the documents
-2. If the information is not in the documents, say "I don't have this information in the documents"
-3. Be specific and cite which document the information comes from
-4. Be concise but complete
-5. If there are monetary values, dates, or names, include them exactly as they appear"""
+    return {**result, "cached": False}
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"Documents:\n{context}\n\nQuestion: {question}"}
-    ]
 
-    try:
-        response = _client.chat.completions.create(
-            model=settings.openai_model,
-            messages=messages,
-            temperature=0.3
-        )
-    except Exception as e:
-        if "temperature" in str(e):
-            response = _client.chat.completions.create(
-                model=settings.openai_model,
-                messages=messages
-            )
-        else:
-            raise e
+async def _answer_async(question: str, embedding: list[float], max_results: int, llm_slots=None) -> dict:
+    """
+    Answer a question whose embedding is already known.
 
-    answer = response.choices[0].message.content
+    Args:
+        llm_slots: Optional semaphore held only around the completion call,
+            to bound concurrent LLM requests
+    """
+    cached = answer_cache.lookup(embedding, max_results)
+    if cached is not None:
+        return {**cached, "cached": True}
 
-    sources = []
-    for doc in documents:
-        metadata = doc.get("metadata", {})
-        sources.append({
-            "filename": metadata.get("filename", "unknown"),
-            "chunk_index": metadata.get("chunk_index", 0),
-            "score": doc.get("score", 0.0),
-            "text": metadata.get("text", "")[:200] + "..."  
-        })
+    version = answer_cache.version()
+    documents = await retrieve_async(question, embedding, max_results)
+
+    if not documents:
+        return {
+            "answer": NO_DOCUMENTS_ANSWER,
+            "sources": [],
+            "context": None,
+            "cached": False
+        }
 
-    return {
-        "answer": answer,
-        "sources": sources
+    packed, sources, context = _pack(documents)
+    messages = _build_messages(question, packed)
+
+    if llm_slots is None:
+        response = await _complete_async(messages)
+    else:
+        async with llm_slots:
+            response = await _complete_async(messages)
+
+    result = {
+        "answer": response.choices[0].message.content,
+        "sources": sources,
+        "context": context
     }
+    answer_cache.store(embedding, max_results, result, version)
+
+    return {**result, "cached": False}
+
+
+async def _shared_answer(question: str, max_results: int, answer):
+    """Await `answer()`, or the answer already being generated for the same question."""
+    if not settings.coalesce_requests:
+        return await answer()
+
+    return await _answer_flights.run((question, max_results), answer)
+
+
+async def generate_answer_async(question: str, max_results: int = 10) -> dict:
+    """
+    Async variant of `generate_answer`.
+
+    Embedding and completion use the async OpenAI client and the searches
+    run in worker threads, so the event loop is never blocked. Concurrent
+    calls with the same question share one answer.
+    """
+    async def answer():
+        with metrics.span("chat", "embed", "openai"):
+            embedding = await generate_embedding_async(question)
+        return await _answer_async(question, embedding, max_results)
+
+    return await _shared_answer(question, max_results, answer)
+
+
+async def generate_answers_async(questions: list[str], max_results: int = 10) -> list[dict | Exception]:
+    """
+    Answer many questions at once.
+
+    All questions are embedded together (one embeddings request per
+    `embedding_batch_size` questions), retrieval runs concurrently for every
+    question and at most `batch_llm_concurrency` completions run at a time.
+    Repeated questions, within the batch or in concurrent requests, are
+    answered once.
+
+    Returns:
+        One entry per question, in order: the result of `generate_answer`,
+        or the exception that question failed with
+    """
+    with metrics.span("chat", "embed", "openai"):
+        embeddings = await generate_embeddings_async(questions)
+    llm_slots = asyncio.Semaphore(settings.batch_llm_concurrency)
+
+    return await asyncio.gather(
+        *(
+            _shared_answer(
+                question, max_results,
+                lambda question=question, embedding=embedding: _answer_async(
+                    question, embedding, max_results, llm_slots
+                )
+            )
+            for question, embedding in zip(questions, embeddings)
+        ),
+        return_exceptions=True
+    )
+
+
+async def stream_answer_async(question: str, max_results: int = 10):
+    """
+    Stream an answer using RAG.
+
+    Yields (event, data) tuples: a single "sources" event with the sources
+    used as context, a "context" event with context statistics (skipped when
+    nothing was retrieved), then one "token" event per piece of generated
+    text. A cached answer is sent as a single "token" event.
+
+    Args:
+        question: The user's question
+        max_results: Number of documents to retrieve
+    """
+    with metrics.span("chat", "embed", "openai"):
+        embedding = await generate_embedding_async(question)
+
+    cached = answer_cache.lookup(embedding, max_results)
+    if cached is not None:
+        yield "sources", cached["sources"]
+        yield "context", cached["context"]
+        yield "token", cached["answer"]
+        return
+
+    version = answer_cache.version()
+    documents = await retrieve_async(question, embedding, max_results)
+
+    if not documents:
+        yield "sources", []
+        yield "token", NO_DOCUMENTS_ANSWER
+        return
+
+    packed, sources, context = _pack(documents)
+    yield "sources", sources
+    yield "context", context
+
+    answer_parts = []
+
+    with metrics.span("chat", "llm_total", "openai") as total:
+        stream = await _create_completion_async(
+            _build_messages(question, packed), stream=True, stream_options={"include_usage": True}
+        )
+
+        async for chunk in stream:
+            _count_usage(getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+
+            content = chunk.choices[0].delta.content
+            if content:
+                if not answer_parts:
+                    metrics.observe("chat", "llm_first_token", time.perf_counter() - total.start)
+                answer_parts.append(content)
+                yield "token", content
+
+    answer_cache.store(
+        embedding, max_results, {"answer": "".join(answer_parts), "sources": sources, "context": context}, version
+    )
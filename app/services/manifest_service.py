@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+import time
+from app.config import settings
+
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _connection() -> sqlite3.Connection:
+    """Open the manifest database on first use."""
+    global _conn
+
+    if _conn is None:
+        os.makedirs(os.path.dirname(settings.manifest_path) or ".", exist_ok=True)
+        _conn = sqlite3.connect(settings.manifest_path, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifests ("
+            "filename TEXT PRIMARY KEY, file_hash TEXT NOT NULL, "
+            "chunking TEXT NOT NULL DEFAULT 'characters', "
+            "chunk_count INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in _conn.execute("PRAGMA table_info(manifests)")}
+        if "chunking" not in columns:
+            # Manifests written before chunking strategies existed used fixed character windows
+            _conn.execute("ALTER TABLE manifests ADD COLUMN chunking TEXT NOT NULL DEFAULT 'characters'")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest_chunks ("
+            "filename TEXT NOT NULL, chunk_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, "
+            "PRIMARY KEY (filename, chunk_id))"
+        )
+
+    return _conn
+
+
+def get_manifest(filename: str) -> dict | None:
+    """
+    Get the stored manifest of a document.
+
+    Returns:
+        Dictionary with file_hash, chunking (strategy name), chunk_count and
+        chunks (chunk_id -> chunk_index), or None if the document has no manifest
+    """
+    with _lock:
+        conn = _connection()
+        row = conn.execute(
+            "SELECT file_hash, chunking, chunk_count FROM manifests WHERE filename = ?", (filename,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        chunks = dict(conn.execute(
+            "SELECT chunk_id, chunk_index FROM manifest_chunks WHERE filename = ?", (filename,)
+        ).fetchall())
+
+    return {"file_hash": row[0], "chunking": row[1], "chunk_count": row[2], "chunks": chunks}
+
+
+def save_manifest(filename: str, file_hash: str, chunking: str, chunk_ids: list[str]) -> None:
+    """Replace the manifest of a document with its current chunk IDs, in order."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute("DELETE FROM manifest_chunks WHERE filename = ?", (filename,))
+            conn.executemany(
+                "INSERT INTO manifest_chunks (filename, chunk_id, chunk_index) VALUES (?, ?, ?)",
+                [(filename, chunk_id, i) for i, chunk_id in enumerate(chunk_ids)]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO manifests (filename, file_hash, chunking, chunk_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (filename, file_hash, chunking, len(chunk_ids), time.time())
+            )
+
+
+def delete_manifest(filename: str) -> None:
+    """Remove the manifest of a document."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute("DELETE FROM manifest_chunks WHERE filename = ?", (filename,))
+            conn.execute("DELETE FROM manifests WHERE filename = ?", (filename,))
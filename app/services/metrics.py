@@ -0,0 +1,194 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stage durations of the current request, when the timing header is enabled
+_request_timings = ContextVar("request_timings", default=None)
+
+_collectors = []
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Counter:
+    """A Prometheus counter with labels."""
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{_format_labels(self.labels, label_values)}}} {value}")
+
+        return lines
+
+
+class Histogram:
+    """A Prometheus histogram with labels and fixed buckets."""
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+
+        with self._lock:
+            series = {label_values: list(values) for label_values, values in self._series.items()}
+
+        for label_values, values in sorted(series.items()):
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, "+Inf"), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Duration of RAG pipeline stages", ("pipeline", "stage")
+)
+TOKENS = Counter("rag_tokens_total", "OpenAI tokens used", ("kind",))
+EXTERNAL_ERRORS = Counter("rag_external_errors_total", "Failed calls to external services", ("service",))
+
+
+class _Span:
+    __slots__ = ("pipeline", "stage", "service", "start")
+
+    def __init__(self, pipeline: str, stage: str, service: str | None):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.service = service
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        observe(self.pipeline, self.stage, time.perf_counter() - self.start)
+        # Cancellation and closed generators (BaseException) are not service errors
+        if exc_type is not None and self.service is not None and issubclass(exc_type, Exception):
+            EXTERNAL_ERRORS.inc(self.service)
+        return False
+
+
+def span(pipeline: str, stage: str, service: str | None = None) -> _Span:
+    """
+    Time a block as a pipeline stage.
+
+    Args:
+        pipeline: "chat" or "ingest"
+        stage: Stage name (e.g. "embed")
+        service: External service called in the block ("openai", "pinecone",
+            "r2"); an exception raised in the block counts as an error for it
+    """
+    return _Span(pipeline, stage, service)
+
+
+def observe(pipeline: str, stage: str, seconds: float) -> None:
+    """Record the duration of a pipeline stage, and add it to the request's timings."""
+    STAGE_SECONDS.observe(seconds, pipeline, stage)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class TimedIterator:
+    """Iterator wrapper that adds up the time spent producing items (`seconds`)."""
+
+    __slots__ = ("_iterator", "seconds")
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def count_tokens(kind: str, amount: int | None) -> None:
+    """Add to the token counter, e.g. count_tokens("prompt", usage.prompt_tokens)."""
+    if amount:
+        TOKENS.inc(kind, amount=amount)
+
+
+def start_request_timings() -> dict:
+    """Collect the stage durations of the current request into the returned dictionary."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: dict) -> str:
+    """Format stage durations as a Server-Timing header value (milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def register_collector(collect) -> None:
+    """
+    Add a function called on every scrape that returns extra metrics as
+    (name, type, description, [(labels dict, value)]) tuples.
+    """
+    _collectors.append(collect)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = STAGE_SECONDS.render() + TOKENS.render() + EXTERNAL_ERRORS.render()
+
+    for collect in _collectors:
+        for name, metric_type, description, samples in collect():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -1,59 +1,181 @@
-from pinecone import Pinecone
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
-from app.services.embedding_service import generate_embedding
+from app.services import coalescing, metrics
+from app.services.embedding_service import (
+    embedding_dimension,
+    generate_embedding,
+    generate_embedding_async,
+    generate_embeddings,
+    generate_embeddings_async,
+)
+from app.services.vector_store import create_vector_store
 
 
-_client = Pinecone(api_key=settings.pinecone_api_key)
+# Pinecone, or the in-process index when VECTOR_STORE=local; created on first use
+_store = None
+_store_lock = threading.Lock()
 
-_index = _client.Index(settings.pinecone_index_name)
+# Concurrent identical queries share one call
+_query_flights = coalescing.SingleFlight("vector_query")
+
+# Concurrent ID listings for bulk deletes (Pinecone lists one prefix per call)
+_LIST_WORKERS = 8
+
+
+def get_store():
+    """The configured vector store, connected or opened on first use."""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_vector_store(embedding_dimension())
+
+    return _store
+
+
+def _build_vectors(documents: list[tuple[str, str, dict]], embeddings: list[list[float]]) -> list[tuple]:
+    """Pair (doc_id, text, metadata) tuples with their embeddings."""
+    vectors = []
+
+    for (doc_id, text, metadata), embedding in zip(documents, embeddings):
+        metadata["text"] = text
+        vectors.append((doc_id, embedding, metadata))
+
+    return vectors
+
+
+def _upsert_vectors(vectors: list[tuple]) -> None:
+    """Upsert vectors in batches of `upsert_batch_size`."""
+    for i in range(0, len(vectors), settings.upsert_batch_size):
+        get_store().upsert(vectors[i:i + settings.upsert_batch_size])
 
 
 def upsert_document(doc_id: str, text: str, metadata: dict) -> bool:
-    """Insert or update a document vector in Pinecone."""
+    """Insert or update a document vector in the vector store."""
     embedding = generate_embedding(text)
     metadata["text"] = text
-    _index.upsert(vectors=[(doc_id, embedding, metadata)])
+    get_store().upsert([(doc_id, embedding, metadata)])
     return True
 
 
-def search_documents(query: str, top_k: int = 5) -> list[dict]:
-    """Search for similar documents using semantic search."""
-    query_embedding = generate_embedding(query)
+def upsert_documents(documents: list[tuple[str, str, dict]], on_progress=None) -> int:
+    """
+    Embed and upsert many document chunks in batches.
+
+    Chunks are embedded `embedding_batch_size` at a time and each group is
+    upserted in batches of `upsert_batch_size` vectors before the next group
+    is embedded, so only one group of vectors is held in memory.
+
+    Args:
+        documents: List of (doc_id, text, metadata) tuples
+        on_progress: Optional callback called with the number of chunks
+            upserted so far after each group
+
+    Returns:
+        Number of vectors upserted
+    """
+    group_size = settings.embedding_batch_size
+
+    for start in range(0, len(documents), group_size):
+        group = documents[start:start + group_size]
+
+        with metrics.span("ingest", "embed", "openai"):
+            embeddings = generate_embeddings([text for _, text, _ in group])
+
+        with metrics.span("ingest", "upsert", settings.vector_store):
+            _upsert_vectors(_build_vectors(group, embeddings))
+
+        if on_progress:
+            on_progress(start + len(group))
+
+    return len(documents)
+
+
+async def upsert_documents_async(documents: list[tuple[str, str, dict]]) -> int:
+    """Async variant of `upsert_documents`. Upserts run in a worker thread."""
+    group_size = settings.embedding_batch_size
 
-    results = _index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True
+    for start in range(0, len(documents), group_size):
+        group = documents[start:start + group_size]
+
+        with metrics.span("ingest", "embed", "openai"):
+            embeddings = await generate_embeddings_async([text for _, text, _ in group])
+
+        with metrics.span("ingest", "upsert", settings.vector_store):
+            await asyncio.to_thread(_upsert_vectors, _build_vectors(group, embeddings))
+
+    return len(documents)
+
+
+def update_metadata(updates: list[tuple[str, dict]]) -> int:
+    """
+    Update metadata fields of existing vectors without re-embedding them.
+
+    Args:
+        updates: List of (doc_id, metadata) tuples; given fields are overwritten
+
+    Returns:
+        Number of vectors updated
+    """
+    if not updates:
+        return 0
+
+    get_store().update_metadata(updates)
+
+    return len(updates)
+
+
+def search_by_vector(vector: list[float], top_k: int = 5) -> list[dict]:
+    """Search for the documents closest to an embedding."""
+    with metrics.span("chat", "vector_query", settings.vector_store):
+        return get_store().query(vector, top_k)
+
+
+async def search_by_vector_async(vector: list[float], top_k: int = 5) -> list[dict]:
+    """
+    Async variant of `search_by_vector`. The query runs in a worker thread;
+    concurrent queries for the same vector and top_k share one call.
+    """
+    if not settings.coalesce_requests:
+        return await asyncio.to_thread(search_by_vector, vector, top_k)
+
+    return await _query_flights.run(
+        (top_k, tuple(vector)), lambda: asyncio.to_thread(search_by_vector, vector, top_k)
     )
 
-    documents = []
 
-    for match in results.matches:
-        documents.append({
-            "id": match.id,
-            "score": match.score,
-            "metadata": match.metadata
-        })
+def search_documents(query: str, top_k: int = 5) -> list[dict]:
+    """Search for similar documents using semantic search."""
+    query_embedding = generate_embedding(query)
+    return search_by_vector(query_embedding, top_k)
+
 
-    return documents
+async def search_documents_async(query: str, top_k: int = 5) -> list[dict]:
+    """Async variant of `search_documents`. The query runs in a worker thread."""
+    query_embedding = await generate_embedding_async(query)
+    return await search_by_vector_async(query_embedding, top_k)
 
 
 def list_ids_by_filename(filename: str) -> list[str]:
     """
     List all vector IDs that belong to a specific filename.
     """
-    results = _index.list(prefix=f"{filename}_")
-    ids = []
-    for id_list in results:
-        ids.extend(id_list)
-    return ids
+    return get_store().list_ids(f"{filename}_")
+
+
+def list_ids_by_filenames(filenames: list[str]) -> dict[str, list[str]]:
+    """List the vector IDs of many filenames concurrently."""
+    with ThreadPoolExecutor(max_workers=_LIST_WORKERS) as executor:
+        return dict(zip(filenames, executor.map(list_ids_by_filename, filenames)))
 
 
 def delete_by_ids(ids: list[str]) -> bool:
     """
-    Delete multiple vectors by their IDs.
+    Delete multiple vectors by their IDs, in batches of `delete_batch_size`.
     """
-    if ids:
-        _index.delete(ids=ids)
+    for i in range(0, len(ids), settings.delete_batch_size):
+        get_store().delete(ids[i:i + settings.delete_batch_size])
     return True
-
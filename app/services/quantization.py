@@ -0,0 +1,90 @@
+import numpy as np
+
+
+# Compact codes of normalized float32 vectors. Codes are rows of bytes,
+# scored against a float query only to pick candidates, which the vector
+# store then re-ranks with the float vectors.
+
+# Binary codes scored at a time, to bound the temporary arrays
+_BLOCK = 8192
+
+# Int8 components converted to float at a time; small enough for the copy to stay in cache
+_INT8_BLOCK_VALUES = 1 << 18
+
+
+class Int8Quantizer:
+    """
+    One signed byte per dimension, scaled per vector so its largest
+    component is 127. The float32 scale is kept in the last 4 bytes of the
+    code, so a code takes `dimension + 4` bytes instead of `4 * dimension`.
+    """
+
+    name = "int8"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.width = dimension + 4
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        scales = np.abs(values).max(axis=1) / 127
+        scales[scales == 0] = 1
+
+        codes = np.empty((len(values), self.width), dtype=np.uint8)
+        codes[:, :self.dimension] = np.rint(values / scales[:, None]).astype(np.int8).view(np.uint8)
+        codes[:, self.dimension:] = scales.astype("<f4")[:, None].view(np.uint8)
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(codes), dtype=np.float32)
+        rows = max(1, _INT8_BLOCK_VALUES // self.dimension)
+
+        for start in range(0, len(codes), rows):
+            block = np.asarray(codes[start:start + rows])
+            scales = np.ascontiguousarray(block[:, self.dimension:]).view("<f4").ravel()
+            values = block[:, :self.dimension].view(np.int8).astype(np.float32)
+            scores[start:start + len(block)] = (values @ query) * scales
+
+        return scores
+
+
+class BinaryQuantizer:
+    """
+    One bit per dimension (its sign), padded to whole 64-bit words: 192
+    bytes for 1536 dimensions. Codes are scored by Hamming distance to the
+    query's signs, so they need more re-ranking than int8 codes.
+    """
+
+    name = "binary"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.width = -(-dimension // 64) * 8
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        codes = np.zeros((len(values), self.width), dtype=np.uint8)
+        bits = np.packbits(values > 0, axis=1)
+        codes[:, :bits.shape[1]] = bits
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        query_words = self.encode(query[None, :]).view(np.uint64)
+        scores = np.empty(len(codes), dtype=np.float32)
+
+        for start in range(0, len(codes), _BLOCK):
+            words = np.ascontiguousarray(codes[start:start + _BLOCK]).view(np.uint64)
+            distances = np.bitwise_count(words ^ query_words).sum(axis=1, dtype=np.int32)
+            scores[start:start + len(words)] = self.dimension - 2 * distances
+
+        return scores
+
+
+_QUANTIZERS = {quantizer.name: quantizer for quantizer in (Int8Quantizer, BinaryQuantizer)}
+
+
+def create_quantizer(name: str, dimension: int):
+    """The quantizer called `name` ("int8" or "binary"), or None for "none"."""
+    if name == "none":
+        return None
+    if name not in _QUANTIZERS:
+        raise ValueError(f"Unknown vector quantization '{name}'. Use 'none', 'int8' or 'binary'.")
+    return _QUANTIZERS[name](dimension)
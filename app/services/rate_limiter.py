@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from app.config import settings
+
+
+# Client-side limits shared by every call to an API, from ingestion threads
+# (sync clients) and chat routes (async clients) alike: token buckets on
+# requests and tokens per minute, a concurrency limit that halves when the
+# API throttles, and retries of throttled and transient failures.
+
+logger = logging.getLogger(__name__)
+
+# Rate limits, timeouts and transient server errors
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Failures without a status code (connection errors), by exception class name
+_RETRY_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "ConnectionError", "ConnectTimeoutError",
+    "MaxRetryError", "ProtocolError", "ReadTimeoutError", "TimeoutError",
+}
+
+# A burst of 429s from calls that were already in flight counts as one signal
+_DECREASE_COOLDOWN = 1.0
+
+
+class TokenBucket:
+    """
+    Allowance of `per_minute` units, refilled continuously (0 = unlimited).
+
+    `take` reserves units and returns how long to wait before using them, so
+    sync and async callers can share a bucket. Reservations may overdraw it;
+    later callers wait until the debt is refilled.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self._available = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(self.per_minute, self._available + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def take(self, amount: float) -> float:
+        if self.per_minute <= 0 or amount <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill()
+            # A call larger than the whole bucket waits for a full bucket
+            self._available -= min(amount, self.per_minute)
+            return max(0.0, -self._available * 60 / self.per_minute)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) units once the actual usage is known."""
+        if self.per_minute <= 0 or not amount:
+            return
+
+        with self._lock:
+            self._refill()
+            self._available = min(self.per_minute, self._available - amount)
+
+    def wait_time(self) -> float:
+        """Seconds until the bucket is out of debt."""
+        if self.per_minute <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill()
+            return max(0.0, -self._available * 60 / self.per_minute)
+
+
+class AdaptiveConcurrency:
+    """
+    Limit on calls in flight that halves when the API throttles and grows by
+    one for every `limit` successful calls (additive increase, multiplicative
+    decrease), between `minimum` and `maximum`. Waiters are served in order,
+    whether they are threads or coroutines.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._decreased = 0.0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _wake(self) -> None:
+        # Hand free slots to waiters; called with the lock held
+        while self._waiters and self._has_slot():
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if not self._waiters and self._has_slot():
+                self.in_flight += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if not self._waiters and self._has_slot():
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was granted before the cancellation arrived
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def increase(self) -> None:
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def decrease(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decreased >= _DECREASE_COOLDOWN:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._decreased = now
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
+
+
+def _status(error: Exception) -> int | None:
+    # OpenAI errors have `status_code`, Pinecone's have `status`
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error: Exception) -> float | None:
+    """The server's requested delay from `Retry-After` (seconds or a date) or `retry-after-ms`."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+
+    headers = {name.lower(): value for name, value in headers.items()}
+
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        pass
+
+    return None
+
+
+class Limiter:
+    """
+    Limits for one API: requests per minute, tokens per minute and adaptive
+    concurrency. `call` and `call_async` wait for the limits, then retry
+    throttled (429), timed-out and 5xx calls up to `max_retries` times, after
+    the server's `Retry-After` or an exponential backoff with jitter.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 64):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.retries = 0
+        self.throttled = 0
+        self._paused_until = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens from the buckets; returns the time to wait."""
+        pause = self._paused_until - time.monotonic()
+        return max(pause, self.requests.take(1), self.tokens.take(tokens), 0.0)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Seconds to wait before retrying after `error`, or None if it shouldn't be retried."""
+        status = _status(error)
+        retryable = status in _RETRY_STATUSES if status is not None else type(error).__name__ in _RETRY_ERRORS
+
+        if not retryable or attempt >= settings.max_retries:
+            return None
+
+        delay = _retry_after(error)
+
+        if status == 429:
+            self.throttled += 1
+            self.concurrency.decrease()
+            # Every caller waits out the server's delay, not just this one
+            if delay is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+        if delay is None:
+            delay = settings.retry_base_delay * 2 ** attempt * random.uniform(0.5, 1.0)
+
+        self.retries += 1
+        delay = min(max(delay, 0.0), settings.retry_max_delay)
+        logger.warning("%s call failed (%s), retrying in %.2fs", self.name, status or type(error).__name__, delay)
+
+        return delay
+
+    def call(self, fn, *args, tokens: int = 0, **kwargs):
+        """
+        Call `fn(*args, **kwargs)` within the limits, retrying transient failures.
+
+        Args:
+            fn: The API call
+            tokens: Estimated tokens the call uses, for the tokens-per-minute limit
+        """
+        attempt = 0
+
+        while True:
+            wait = self._reserve(tokens)
+            if wait:
+                time.sleep(wait)
+
+            with self.concurrency:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self.concurrency.increase()
+                    return result
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn, *args, tokens: int = 0, **kwargs):
+        """Async variant of `call` for coroutine functions."""
+        attempt = 0
+
+        while True:
+            wait = self._reserve(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+
+            async with self.concurrency:
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as error:
+                    delay = self._retry_delay(error, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self.concurrency.increase()
+                    return result
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def backlog(self) -> float:
+        """Seconds a new call would wait for the rate limits."""
+        return max(self._paused_until - time.monotonic(), self.requests.wait_time(), self.tokens.wait_time())
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "backlog_seconds": self.backlog(),
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
+
+
+openai = Limiter(
+    "openai",
+    requests_per_minute=settings.openai_requests_per_minute,
+    tokens_per_minute=settings.openai_tokens_per_minute,
+    max_concurrency=settings.openai_max_concurrency,
+)
+
+pinecone = Limiter(
+    "pinecone",
+    requests_per_minute=settings.pinecone_requests_per_minute,
+    max_concurrency=settings.pinecone_max_concurrency,
+)
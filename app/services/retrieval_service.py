@@ -0,0 +1,60 @@
+import asyncio
+from app.config import settings
+from app.services import keyword_index
+from app.services.pinecone_service import search_by_vector, search_by_vector_async
+
+
+def _fuse(vector_results: list[dict], keyword_results: list[dict], top_k: int) -> list[dict]:
+    """
+    Merge the vector and keyword rankings with reciprocal-rank fusion.
+
+    Each document scores sum(1 / (rrf_k + rank)) over the rankings it
+    appears in, so documents ranked well by both searches come first. The
+    fused score is stored in `rrf_score`; `score` stays the vector
+    similarity (0 for documents found only by keyword search).
+    """
+    fused = {}
+
+    for ranking in (vector_results, keyword_results):
+        for rank, doc in enumerate(ranking, 1):
+            entry = fused.setdefault(doc["id"], {**doc, "score": 0.0, "rrf_score": 0.0})
+            entry["rrf_score"] += 1 / (settings.rrf_k + rank)
+
+    for doc in vector_results:
+        fused[doc["id"]]["score"] = doc.get("score", 0.0)
+
+    return sorted(fused.values(), key=lambda doc: doc["rrf_score"], reverse=True)[:top_k]
+
+
+def retrieve(question: str, embedding: list[float], top_k: int = 5) -> list[dict]:
+    """
+    Find the chunks most relevant to a question.
+
+    With hybrid search enabled, vector search and BM25 keyword search each
+    return `hybrid_candidates` results, which are fused with RRF. Keyword
+    search catches exact identifiers (invoice numbers, SKUs, names) that
+    embeddings tend to miss.
+
+    Args:
+        question: The user's question
+        embedding: Embedding of the question
+        top_k: Number of chunks to return
+    """
+    if not settings.hybrid_search:
+        return search_by_vector(embedding, top_k)
+
+    depth = max(top_k, settings.hybrid_candidates)
+    return _fuse(search_by_vector(embedding, depth), keyword_index.search(question, depth), top_k)
+
+
+async def retrieve_async(question: str, embedding: list[float], top_k: int = 5) -> list[dict]:
+    """Async variant of `retrieve`. Both searches run concurrently in worker threads."""
+    if not settings.hybrid_search:
+        return await search_by_vector_async(embedding, top_k)
+
+    depth = max(top_k, settings.hybrid_candidates)
+    vector_results, keyword_results = await asyncio.gather(
+        search_by_vector_async(embedding, depth),
+        keyword_index.search_async(question, depth)
+    )
+    return _fuse(vector_results, keyword_results, top_k)
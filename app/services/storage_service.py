@@ -1,65 +1,257 @@
-import boto3
-from botocore.config import Config
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from app.config import settings
+from app.services import clients
 
 
-_client = boto3.client(
-    "s3",
-    endpoint_url=f"https://{settings.r2_account_id}.r2.cloudflarestorage.com",
-    aws_access_key_id=settings.r2_access_key_id,
-    aws_secret_access_key=settings.r2_secret_access_key,
-    config=Config(signature_version="s3v4"),
-    region_name="auto",
-)
-
 _bucket = settings.r2_bucket_name
 
+_transfer_config = None
+
+# DeleteObjects accepts at most 1000 keys per request
+_DELETE_BATCH_SIZE = 1000
+
+# Concurrent HEAD requests when checking many files
+_HEAD_WORKERS = 16
+
+# Size of the pieces a download is streamed in
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Suffix of objects uploaded by ingestion jobs that haven't finished; they are not listed
+_PARTIAL_SUFFIX = ".partial"
+
+# Response headers passed on to the client when serving a file
+_DOWNLOAD_HEADERS = ("content-length", "content-range", "etag", "last-modified", "accept-ranges")
+
+
+def _get_transfer_config():
+    """
+    Files above one part are sent as a multipart upload. At most
+    `r2_upload_concurrency` parts are read into memory and in flight at a time.
+    """
+    global _transfer_config
+
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+
+        _transfer_config = TransferConfig(
+            multipart_threshold=settings.r2_part_size,
+            multipart_chunksize=settings.r2_part_size,
+            max_concurrency=settings.r2_upload_concurrency,
+            max_io_queue=settings.r2_upload_concurrency,
+        )
+
+    return _transfer_config
+
 
 def upload_file(file_path: str, filename: str) -> None:
-    """Upload a file to R2."""
-    _client.upload_file(file_path, _bucket, filename)
+    """Upload a file to R2, in parallel parts if it is larger than one part."""
+    clients.s3_client().upload_file(file_path, _bucket, filename, Config=_get_transfer_config())
+
+
+def partial_key(filename: str, job_id: str) -> str:
+    """Key a job uploads its file to until the document has been ingested."""
+    return f"{filename}.{job_id}{_PARTIAL_SUFFIX}"
+
+
+def move_file(source: str, filename: str) -> None:
+    """Copy an object to `filename` (in parallel parts if large) and delete the source."""
+    clients.s3_client().copy(
+        {"Bucket": _bucket, "Key": source}, _bucket, filename, Config=_get_transfer_config()
+    )
+    clients.s3_client().delete_object(Bucket=_bucket, Key=source)
 
 
 def download_file(filename: str, destination: str) -> None:
     """Download a file from R2."""
-    _client.download_file(_bucket, filename, destination)
+    clients.s3_client().download_file(_bucket, filename, destination)
 
 
 def delete_file(filename: str) -> None:
     """Delete a file from R2."""
-    _client.delete_object(Bucket=_bucket, Key=filename)
+    clients.s3_client().delete_object(Bucket=_bucket, Key=filename)
+
+
+def delete_files(filenames: list[str]) -> None:
+    """Delete many files from R2, up to 1000 per request."""
+    for i in range(0, len(filenames), _DELETE_BATCH_SIZE):
+        batch = filenames[i:i + _DELETE_BATCH_SIZE]
+        clients.s3_client().delete_objects(
+            Bucket=_bucket,
+            Delete={"Objects": [{"Key": filename} for filename in batch], "Quiet": True},
+        )
 
 
 def file_exists(filename: str) -> bool:
     """Check if a file exists in R2."""
+    from botocore.exceptions import ClientError
+
     try:
-        _client.head_object(Bucket=_bucket, Key=filename)
+        clients.s3_client().head_object(Bucket=_bucket, Key=filename)
         return True
-    except _client.exceptions.ClientError:
+    except ClientError:
         return False
 
 
+def files_exist(filenames: list[str]) -> dict[str, bool]:
+    """Check which of many files exist in R2."""
+    with ThreadPoolExecutor(max_workers=_HEAD_WORKERS) as executor:
+        return dict(zip(filenames, executor.map(file_exists, filenames)))
+
+
 def get_file_size(filename: str) -> int:
     """Get file size in bytes."""
-    response = _client.head_object(Bucket=_bucket, Key=filename)
+    response = clients.s3_client().head_object(Bucket=_bucket, Key=filename)
     return response["ContentLength"]
 
 
-def list_files() -> list[dict]:
-    """List all files in the bucket."""
-    response = _client.list_objects_v2(Bucket=_bucket)
-    files = []
+def iter_files():
+    """Yield {"filename", "size_bytes"} for every file in the bucket, one page of 1000 keys at a time."""
+    paginator = clients.s3_client().get_paginator("list_objects_v2")
 
-    for obj in response.get("Contents", []):
-        files.append({
-            "filename": obj["Key"],
-            "size_bytes": obj["Size"],
-        })
+    for page in paginator.paginate(Bucket=_bucket):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(_PARTIAL_SUFFIX):
+                continue
+            yield {
+                "filename": obj["Key"],
+                "size_bytes": obj["Size"],
+            }
 
-    return files
+
+def list_files() -> list[dict]:
+    """List all files in the bucket."""
+    return list(iter_files())
 
 
 def get_file_stream(filename: str):
     """Get a file stream for downloading."""
-    response = _client.get_object(Bucket=_bucket, Key=filename)
+    response = clients.s3_client().get_object(Bucket=_bucket, Key=filename)
     return response["Body"]
+
+
+def _range_condition(if_range: str) -> dict | None:
+    """
+    GetObject arguments that fail with 412 unless the object still matches
+    the client's If-Range validator, or None if it can't be checked.
+    """
+    if if_range.startswith('"'):
+        return {"IfMatch": if_range}
+    if if_range.startswith("W/"):
+        # Weak ETags never match for ranges
+        return None
+    try:
+        return {"IfUnmodifiedSince": parsedate_to_datetime(if_range)}
+    except (TypeError, ValueError):
+        return None
+
+
+def get_file(filename: str, byte_range: str | None = None, if_none_match: str | None = None,
+             if_modified_since: str | None = None, if_range: str | None = None) -> dict:
+    """
+    Get a file with a single GetObject request.
+
+    The client's Range, If-None-Match and If-Modified-Since headers are
+    passed through to R2, so there is no separate HEAD request. With
+    If-Range, the range is only served if the object still matches the
+    validator; otherwise (or if the validator can't be checked) the whole
+    file is sent, which takes a second request when the object changed.
+
+    Returns:
+        Dictionary with status (200, 206 or 304), headers (the HTTP headers
+        to send) and body (an iterator of bytes, None for 304). Except for
+        304, `close` releases the connection once the body was sent.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the range can't be satisfied
+    """
+    from botocore.exceptions import ClientError
+
+    kwargs = {}
+    if byte_range:
+        condition = _range_condition(if_range) if if_range else {}
+        if condition is not None:
+            kwargs["Range"] = byte_range
+            kwargs.update(condition)
+    if if_none_match:
+        kwargs["IfNoneMatch"] = if_none_match
+    if if_modified_since:
+        try:
+            kwargs["IfModifiedSince"] = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        response = clients.s3_client().get_object(Bucket=_bucket, Key=filename, **kwargs)
+    except ClientError as e:
+        metadata = e.response.get("ResponseMetadata", {})
+        status = metadata.get("HTTPStatusCode")
+
+        if status == 304:
+            headers = metadata.get("HTTPHeaders", {})
+            return {
+                "status": 304,
+                "headers": {name: headers[name] for name in ("etag", "last-modified") if name in headers},
+                "body": None,
+            }
+        if status == 412 and "Range" in kwargs:
+            # The object changed since the client's copy: send all of it
+            return get_file(filename, None, if_none_match, if_modified_since)
+        if status == 404:
+            raise FileNotFoundError(filename)
+        if status == 416:
+            raise ValueError(f"Range '{byte_range}' can't be satisfied")
+        raise
+
+    headers = response["ResponseMetadata"]["HTTPHeaders"]
+    body = response["Body"]
+
+    return {
+        "status": 206 if "content-range" in headers else 200,
+        "headers": {"accept-ranges": "bytes", **{name: headers[name] for name in _DOWNLOAD_HEADERS if name in headers}},
+        "body": body.iter_chunks(_STREAM_CHUNK_SIZE),
+        "close": body.close,
+    }
+
+
+async def upload_file_async(file_path: str, filename: str) -> None:
+    """Upload a file to R2 from a worker thread."""
+    await asyncio.to_thread(upload_file, file_path, filename)
+
+
+async def delete_file_async(filename: str) -> None:
+    """Delete a file from R2 from a worker thread."""
+    await asyncio.to_thread(delete_file, filename)
+
+
+async def delete_files_async(filenames: list[str]) -> None:
+    """Delete many files from R2 from a worker thread."""
+    await asyncio.to_thread(delete_files, filenames)
+
+
+async def files_exist_async(filenames: list[str]) -> dict[str, bool]:
+    """Check which of many files exist in R2 from a worker thread."""
+    return await asyncio.to_thread(files_exist, filenames)
+
+
+async def file_exists_async(filename: str) -> bool:
+    """Check if a file exists in R2 from a worker thread."""
+    return await asyncio.to_thread(file_exists, filename)
+
+
+async def list_files_async() -> list[dict]:
+    """List all files in the bucket from a worker thread."""
+    return await asyncio.to_thread(list_files)
+
+
+async def get_file_async(filename: str, byte_range: str | None = None, if_none_match: str | None = None,
+                         if_modified_since: str | None = None, if_range: str | None = None) -> dict:
+    """Get a file from a worker thread."""
+    return await asyncio.to_thread(get_file, filename, byte_range, if_none_match, if_modified_since, if_range)
+
+
+async def get_file_stream_async(filename: str):
+    """Get a file stream for downloading from a worker thread."""
+    return await asyncio.to_thread(get_file_stream, filename)
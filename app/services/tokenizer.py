@@ -0,0 +1,61 @@
+import logging
+import re
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by text-embedding-3-small and the GPT-4o family
+ENCODING_NAME = "cl100k_base"
+
+# Fallback when the tiktoken encoding can't be loaded (e.g. offline without
+# a cached BPE file): one token per word or punctuation mark, keeping the
+# leading whitespace so that decoding is a plain join.
+_FALLBACK_PATTERN = re.compile(r"\s*\w+|\s*[^\w\s]|\s+")
+
+_lock = threading.Lock()
+_encoding = None
+_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use, or None if it is unavailable."""
+    global _encoding, _loaded
+
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    logger.warning("Could not load tiktoken encoding %s, token counts are approximate: %s",
+                                   ENCODING_NAME, e)
+                _loaded = True
+
+    return _encoding
+
+
+def encode(text: str) -> list:
+    """Split text into tokens."""
+    encoding = _get_encoding()
+
+    if encoding is None:
+        return _FALLBACK_PATTERN.findall(text)
+
+    return encoding.encode(text, disallowed_special=())
+
+
+def decode(tokens: list) -> str:
+    """Turn tokens produced by `encode` back into text."""
+    encoding = _get_encoding()
+
+    if encoding is None:
+        return "".join(tokens)
+
+    return encoding.decode(tokens)
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in a text."""
+    return len(encode(text))
@@ -0,0 +1,568 @@
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.config import settings
+from app.services import clients, rate_limiter
+from app.services.quantization import create_quantizer
+
+
+# Concurrent metadata-only updates (Pinecone updates one vector per call)
+_UPDATE_WORKERS = 8
+
+
+class VectorStore:
+    """
+    Base class for vector backends.
+
+    Vectors are (id, values, metadata) tuples. `query` returns dictionaries
+    with id, score (cosine similarity) and metadata, best match first.
+    """
+
+    def upsert(self, vectors: list[tuple]) -> None:
+        raise NotImplementedError
+
+    def update_metadata(self, updates: list[tuple[str, dict]]) -> None:
+        raise NotImplementedError
+
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        raise NotImplementedError
+
+    def list_ids(self, prefix: str) -> list[str]:
+        raise NotImplementedError
+
+    def delete(self, ids: list[str]) -> None:
+        raise NotImplementedError
+
+    def index_dimension(self) -> int | None:
+        """Dimension of the stored vectors, or None while the index is empty."""
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """Vectors stored in a Pinecone index. Calls are rate limited and retried."""
+
+    def __init__(self, client, index_name: str):
+        self.index = client.Index(index_name)
+        self.limiter = rate_limiter.pinecone
+
+    def upsert(self, vectors: list[tuple]) -> None:
+        self.limiter.call(self.index.upsert, vectors=vectors)
+
+    def update_metadata(self, updates: list[tuple[str, dict]]) -> None:
+        def update(update):
+            self.limiter.call(self.index.update, id=update[0], set_metadata=update[1])
+
+        with ThreadPoolExecutor(max_workers=_UPDATE_WORKERS) as executor:
+            list(executor.map(update, updates))
+
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        results = self.limiter.call(self.index.query, vector=vector, top_k=top_k, include_metadata=True)
+
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata}
+            for match in results.matches
+        ]
+
+    def list_ids(self, prefix: str) -> list[str]:
+        def list_all():
+            ids = []
+            for id_list in self.index.list(prefix=prefix):
+                ids.extend(id_list)
+            return ids
+
+        return self.limiter.call(list_all)
+
+    def delete(self, ids: list[str]) -> None:
+        self.limiter.call(self.index.delete, ids=ids)
+
+    def index_dimension(self) -> int | None:
+        return self.limiter.call(self.index.describe_index_stats).dimension
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for small deployments, tests and benchmarks.
+
+    Normalized float32 vectors live in a NumPy matrix memory-mapped from
+    `<path>/vectors.f32`; IDs, row numbers and metadata live in SQLite
+    (`<path>/vectors.db`). Queries are an exact brute-force matrix product
+    with `argpartition` top-k. Rows freed by deletes are reused by later
+    upserts.
+
+    With `quantization` ("int8" or "binary"), compact codes of the vectors
+    are kept in `<path>/vectors.<quantization>` and queries score the codes
+    instead. The best `top_k * rerank_factor` candidates are re-ranked with
+    their float vectors, which are only read for those rows.
+    """
+
+    _INITIAL_CAPACITY = 1024
+    _ENCODE_BLOCK = 65_536
+
+    def __init__(self, path: str, quantization: str = "none", rerank_factor: int = 10):
+        os.makedirs(path, exist_ok=True)
+        self.matrix_path = os.path.join(path, "vectors.f32")
+        self.quantization = quantization
+        self.codes_path = os.path.join(path, f"vectors.{quantization}")
+        self.rerank_factor = rerank_factor
+        self.quantizer = None
+        self.codes = None
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(path, "vectors.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, metadata TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS store (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        row = self.conn.execute("SELECT value FROM store WHERE key = 'dimension'").fetchone()
+        self.dimension = int(row[0]) if row else None
+        self.matrix = None
+
+        # ID -> row and row -> ID (None for free rows), kept in memory
+        self.rows = dict(self.conn.execute("SELECT id, row FROM vectors"))
+        self.size = max(self.rows.values()) + 1 if self.rows else 0
+        self.row_ids = [None] * self.size
+        for vector_id, r in self.rows.items():
+            self.row_ids[r] = vector_id
+        self.free_rows = [r for r, vector_id in enumerate(self.row_ids) if vector_id is None]
+        self.live = np.array([vector_id is not None for vector_id in self.row_ids], dtype=bool)
+
+        if self.dimension is not None:
+            self.quantizer = create_quantizer(quantization, self.dimension)
+            self._open_matrix(max(self.size, self._INITIAL_CAPACITY))
+            self._check_codes()
+
+    def _open_matrix(self, capacity: int) -> None:
+        """Map the matrix file with room for `capacity` rows, growing the file if needed."""
+        mode = "r+" if os.path.exists(self.matrix_path) else "w+"
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode=mode, shape=(capacity, self.dimension))
+
+        if self.quantizer is not None:
+            mode = "r+" if os.path.exists(self.codes_path) else "w+"
+            self.codes = np.memmap(
+                self.codes_path, dtype=np.uint8, mode=mode, shape=(capacity, self.quantizer.width)
+            )
+
+    def _check_codes(self) -> None:
+        """Encode every row if the codes were written with another quantization (or not at all)."""
+        row = self.conn.execute("SELECT value FROM store WHERE key = 'quantization'").fetchone()
+        if row is not None and row[0] == self.quantization:
+            return
+
+        if self.quantizer is not None:
+            for start in range(0, self.size, self._ENCODE_BLOCK):
+                end = min(start + self._ENCODE_BLOCK, self.size)
+                self.codes[start:end] = self.quantizer.encode(np.asarray(self.matrix[start:end]))
+            self.codes.flush()
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO store (key, value) VALUES ('quantization', ?)", (self.quantization,)
+            )
+
+    def _allocate_rows(self, count: int) -> list[int]:
+        """Take `count` rows, reusing free rows first and growing the matrix if needed."""
+        rows = [self.free_rows.pop() for _ in range(min(count, len(self.free_rows)))]
+        extra = count - len(rows)
+
+        if extra:
+            rows.extend(range(self.size, self.size + extra))
+            self.size += extra
+            self.row_ids.extend([None] * extra)
+            self.live = np.concatenate([self.live, np.zeros(extra, dtype=bool)])
+
+            if self.size > len(self.matrix):
+                self.matrix.flush()
+                self._open_matrix(max(self.size, 2 * len(self.matrix)))
+
+        return rows
+
+    def upsert(self, vectors: list[tuple]) -> None:
+        if not vectors:
+            return
+
+        values = np.asarray([vector[1] for vector in vectors], dtype=np.float32)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values /= np.where(norms == 0, 1, norms)
+
+        with self.lock:
+            if self.dimension is None:
+                self.dimension = values.shape[1]
+                with self.conn:
+                    self.conn.execute("INSERT INTO store (key, value) VALUES ('dimension', ?)", (str(self.dimension),))
+                self.quantizer = create_quantizer(self.quantization, self.dimension)
+                self._open_matrix(self._INITIAL_CAPACITY)
+                self._check_codes()
+            elif values.shape[1] != self.dimension:
+                raise ValueError(f"Vector dimension {values.shape[1]} does not match the index ({self.dimension})")
+
+            new_ids = list(dict.fromkeys(vector_id for vector_id, _, _ in vectors if vector_id not in self.rows))
+            new_rows = self._allocate_rows(len(new_ids))
+            for vector_id, row in zip(new_ids, new_rows):
+                self.rows[vector_id] = row
+                self.row_ids[row] = vector_id
+
+            rows = [self.rows[vector_id] for vector_id, _, _ in vectors]
+            self.matrix[rows] = values
+            self.matrix.flush()
+            if self.codes is not None:
+                self.codes[rows] = self.quantizer.encode(values)
+                self.codes.flush()
+            self.live[new_rows] = True
+
+            try:
+                self._on_upsert(rows, values)
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO vectors (id, row, metadata) VALUES (?, ?, ?)",
+                        [(vector_id, row, json.dumps(metadata)) for (vector_id, _, metadata), row in zip(vectors, rows)]
+                    )
+            except BaseException:
+                # Free the new rows again so memory matches SQLite
+                for vector_id, row in zip(new_ids, new_rows):
+                    del self.rows[vector_id]
+                    self.row_ids[row] = None
+                self.live[new_rows] = False
+                self.free_rows.extend(new_rows)
+                raise
+
+        self._after_upsert()
+
+    def update_metadata(self, updates: list[tuple[str, dict]]) -> None:
+        with self.lock:
+            with self.conn:
+                for vector_id, fields in updates:
+                    row = self.conn.execute("SELECT metadata FROM vectors WHERE id = ?", (vector_id,)).fetchone()
+                    if row is not None:
+                        self.conn.execute(
+                            "UPDATE vectors SET metadata = ? WHERE id = ?",
+                            (json.dumps({**json.loads(row[0]), **fields}), vector_id)
+                        )
+
+    def _on_upsert(self, rows: list[int], values: np.ndarray) -> None:
+        """Called with the lock held after vectors were written to `rows`."""
+
+    def _after_upsert(self) -> None:
+        """Called without the lock once an upsert is complete, for slow maintenance work."""
+
+    def _scores(self, matrix: np.ndarray, rows: np.ndarray | None, query: np.ndarray) -> np.ndarray:
+        """Scores of `rows` (every row if None): exact, or from the quantized codes."""
+        if self.quantizer is None:
+            return matrix @ query if rows is None else matrix[rows] @ query
+
+        codes = self.codes[:len(matrix)]
+        return self.quantizer.score(codes if rows is None else codes[rows], query)
+
+    def _score(self, matrix: np.ndarray, live: np.ndarray, query: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return candidate rows and their scores. Exact search scores every live row."""
+        scores = self._scores(matrix, None, query)
+        scores[~live] = -np.inf
+        return np.arange(len(scores)), scores
+
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        with self.lock:
+            if not self.rows or top_k <= 0:
+                return []
+            # Rows added after this point are not visible to this query
+            matrix = self.matrix[:self.size]
+            live = self.live.copy()
+
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+
+        rows, scores = self._score(matrix, live, query)
+
+        candidates = top_k * self.rerank_factor if self.quantizer is not None else top_k
+        candidates = min(candidates, int(np.isfinite(scores).sum()))
+        if candidates == 0:
+            return []
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        rows, scores = rows[top], scores[top]
+
+        if self.quantizer is not None:
+            # Re-rank the candidates by their float vectors
+            scores = matrix[rows] @ query
+
+        order = np.argsort(-scores)[:top_k]
+        rows, scores = rows[order], scores[order]
+
+        with self.lock:
+            ids = [self.row_ids[r] for r in rows]
+            metadata = dict(self.conn.execute(
+                f"SELECT id, metadata FROM vectors WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall())
+
+        # Vectors deleted while the query was running are dropped
+        return [
+            {"id": vector_id, "score": float(score), "metadata": json.loads(metadata[vector_id])}
+            for vector_id, score in zip(ids, scores)
+            if vector_id in metadata
+        ]
+
+    def list_ids(self, prefix: str) -> list[str]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id FROM vectors WHERE id >= ? AND id < ? ORDER BY id", (prefix, prefix + "\U0010ffff")
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def index_dimension(self) -> int | None:
+        return self.dimension
+
+    def delete(self, ids: list[str]) -> None:
+        with self.lock:
+            rows = [self.rows.pop(vector_id) for vector_id in ids if vector_id in self.rows]
+
+            for row in rows:
+                self.row_ids[row] = None
+            self.live[rows] = False
+            self.free_rows.extend(rows)
+
+            with self.conn:
+                self.conn.executemany("DELETE FROM vectors WHERE id = ?", [(vector_id,) for vector_id in ids])
+
+
+class IVFVectorStore(LocalVectorStore):
+    """
+    Approximate nearest-neighbour variant of `LocalVectorStore` (IVF-flat).
+
+    Vectors are clustered around `nlist` centroids (spherical k-means) and a
+    query only scores the vectors of its `nprobe` closest clusters, so recall
+    and latency are traded off with `nprobe`. Below `min_train_size` vectors
+    the index is untrained and search is exact.
+
+    Inserts are assigned to their closest centroid as they arrive. Deleted
+    rows are tombstoned: they stay in their cluster list, are skipped at
+    query time and are only removed when their row is reused or the store is
+    reopened. The index is
+    retrained (and tombstones purged) each time it doubles in size. Training
+    runs on a snapshot without holding the lock, so queries and upserts go on
+    meanwhile; rows written during training are reassigned when the new
+    centroids are swapped in.
+    Centroids are saved to `<path>/centroids.npy` and cluster assignments to
+    the memory-mapped `<path>/assignments.i32`.
+    """
+
+    _KMEANS_ITERATIONS = 10
+    _TRAIN_SAMPLE_PER_LIST = 64
+    _MAX_TRAIN_SAMPLE = 65_536
+    # Vector-centroid scores computed at a time (64 MB of float32)
+    _SCORE_BLOCK = 1 << 24
+
+    def __init__(self, path: str, nlist: int = 0, nprobe: int = 16, min_train_size: int = 10_000,
+                 quantization: str = "none", rerank_factor: int = 10):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.centroids_path = os.path.join(path, "centroids.npy")
+        self.assignments_path = os.path.join(path, "assignments.i32")
+        self.assignments = None
+        self.centroids = None
+        self.lists = []
+        self.list_arrays = []
+        self.trained_size = 0
+        self.training = False
+        self.dirty_rows = set()
+
+        super().__init__(path, quantization, rerank_factor)
+
+        if os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+            self.trained_size = int(self.conn.execute(
+                "SELECT value FROM store WHERE key = 'trained_size'"
+            ).fetchone()[0])
+            self._build_lists()
+
+    def _open_matrix(self, capacity: int) -> None:
+        super()._open_matrix(capacity)
+        # Cluster number + 1 per row; 0 means not assigned yet
+        mode = "r+" if os.path.exists(self.assignments_path) else "w+"
+        self.assignments = np.memmap(self.assignments_path, dtype=np.int32, mode=mode, shape=(capacity,))
+
+    def _nearest(self, values: np.ndarray, centroids: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Closest centroid of each vector (of `rows` of `values`, if given), in blocks to bound memory."""
+        count = len(values) if rows is None else len(rows)
+        block = max(1, self._SCORE_BLOCK // len(centroids))
+        labels = np.empty(count, dtype=np.int32)
+
+        for i in range(0, count, block):
+            part = values[i:i + block] if rows is None else values[rows[i:i + block]]
+            labels[i:i + block] = np.argmax(np.asarray(part) @ centroids.T, axis=1)
+
+        return labels
+
+    def _assign(self, values: np.ndarray) -> np.ndarray:
+        return self._nearest(values, self.centroids)
+
+    def _build_lists(self) -> None:
+        """Rebuild the cluster lists from the live rows, assigning rows that have no cluster."""
+        # Tombstones are not in any list, so a row reused later must not look assigned
+        self.assignments[:len(self.live)][~self.live] = 0
+
+        live_rows = np.flatnonzero(self.live)
+        unassigned = live_rows[self.assignments[live_rows] == 0]
+        if len(unassigned):
+            self.assignments[unassigned] = self._assign(self.matrix[unassigned]) + 1
+
+        clusters = self.assignments[live_rows] - 1
+        order = np.argsort(clusters, kind="stable")
+        bounds = np.searchsorted(clusters[order], np.arange(len(self.centroids) + 1))
+
+        self.list_arrays = [live_rows[order[bounds[c]:bounds[c + 1]]] for c in range(len(self.centroids))]
+        self.lists = [array.tolist() for array in self.list_arrays]
+        self.assignments.flush()
+
+    def _kmeans(self, matrix: np.ndarray, live_rows: np.ndarray) -> np.ndarray:
+        """Spherical k-means centroids of a sample of the live vectors."""
+        nlist = min(self.nlist or max(1, int(4 * np.sqrt(len(live_rows)))), len(live_rows))
+        rng = np.random.default_rng(0)
+
+        sample_size = min(len(live_rows), nlist * self._TRAIN_SAMPLE_PER_LIST, max(nlist, self._MAX_TRAIN_SAMPLE))
+        sample = np.asarray(matrix[np.sort(rng.choice(live_rows, sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+
+        for _ in range(self._KMEANS_ITERATIONS):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+
+            # Empty clusters are re-seeded with random sample vectors
+            empty = ~np.bincount(labels, minlength=nlist).astype(bool)
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+        return centroids.astype(np.float32)
+
+    def _train(self) -> None:
+        """
+        Cluster the live vectors and reassign every row. Clustering and
+        assignment use a snapshot taken under the lock; the results are
+        swapped in under the lock, after reassigning rows written meanwhile.
+        """
+        with self.lock:
+            matrix = self.matrix[:self.size]
+            live_rows = np.flatnonzero(self.live)
+            self.dirty_rows = set()
+
+        centroids = self._kmeans(matrix, live_rows)
+        clusters = self._nearest(matrix, centroids, live_rows)
+
+        with self.lock:
+            self.centroids = centroids
+            self.trained_size = len(live_rows)
+            self.assignments[:] = 0
+            self.assignments[live_rows] = clusters + 1
+
+            # Rows written since the snapshot may hold other vectors now
+            dirty = np.array(sorted(self.dirty_rows), dtype=np.int64)
+            if len(dirty):
+                self.assignments[dirty] = self._assign(self.matrix[dirty]) + 1
+            self.dirty_rows = set()
+            self._build_lists()
+
+            np.save(self.centroids_path, self.centroids)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO store (key, value) VALUES ('trained_size', ?)", (str(self.trained_size),)
+                )
+
+    def _on_upsert(self, rows: list[int], values: np.ndarray) -> None:
+        if self.training:
+            self.dirty_rows.update(rows)
+
+        if self.centroids is None:
+            return
+
+        for row, cluster in zip(rows, self._assign(values)):
+            previous = self.assignments[row] - 1
+            if previous == cluster and row in self.lists[cluster]:
+                continue
+            if previous >= 0 and row in self.lists[previous]:
+                # Row reused after a delete, or vector changed: leave the old cluster
+                self.lists[previous].remove(row)
+                self.list_arrays[previous] = None
+            self.lists[cluster].append(row)
+            self.list_arrays[cluster] = None
+            self.assignments[row] = cluster + 1
+
+        self.assignments.flush()
+
+    def _after_upsert(self) -> None:
+        with self.lock:
+            if self.training or len(self.rows) < max(self.min_train_size, 2 * self.trained_size):
+                return
+            self.training = True
+
+        try:
+            self._train()
+        finally:
+            with self.lock:
+                self.training = False
+
+    def _score(self, matrix: np.ndarray, live: np.ndarray, query: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        with self.lock:
+            if self.centroids is None:
+                centroids = None
+            else:
+                centroids = self.centroids
+                probes = np.argpartition(-(centroids @ query), min(self.nprobe, len(centroids)) - 1)[:self.nprobe]
+                for c in probes:
+                    if self.list_arrays[c] is None:
+                        self.list_arrays[c] = np.array(self.lists[c], dtype=np.int64)
+                candidates = np.concatenate([self.list_arrays[c] for c in probes])
+
+        if centroids is None:
+            return super()._score(matrix, live, query)
+
+        candidates = candidates[candidates < len(live)]
+        candidates = candidates[live[candidates]]
+        return candidates, self._scores(matrix, candidates, query)
+
+
+def _create() -> VectorStore:
+    if settings.vector_store == "pinecone":
+        return PineconeVectorStore(clients.pinecone_client(), settings.pinecone_index_name)
+    if settings.vector_store == "local":
+        return LocalVectorStore(
+            settings.local_index_path,
+            quantization=settings.vector_quantization,
+            rerank_factor=settings.quantization_rerank_factor
+        )
+    if settings.vector_store == "ivf":
+        return IVFVectorStore(
+            settings.local_index_path,
+            nlist=settings.ivf_nlist,
+            nprobe=settings.ivf_nprobe,
+            min_train_size=settings.ivf_min_train_size,
+            quantization=settings.vector_quantization,
+            rerank_factor=settings.quantization_rerank_factor
+        )
+
+    raise ValueError(f"Unknown vector store '{settings.vector_store}'. Use 'pinecone', 'local' or 'ivf'.")
+
+
+def create_vector_store(dimension: int | None = None) -> VectorStore:
+    """
+    Build the vector store selected by `settings.vector_store`.
+
+    Args:
+        dimension: Dimension of the embeddings; raises ValueError if the
+            index already holds vectors of another dimension
+    """
+    store = _create()
+
+    if dimension is not None:
+        index_dimension = store.index_dimension()
+        if index_dimension is not None and index_dimension != dimension:
+            raise ValueError(
+                f"The vector index has dimension {index_dimension} but embeddings have {dimension}. "
+                f"Set EMBEDDING_DIMENSIONS={index_dimension} or create a new index."
+            )
+
+    return store
@@ -0,0 +1,97 @@
+"""
+IVF index: recall@k and query latency against exact search.
+
+Builds an `IVFVectorStore` from clustered synthetic embeddings at each size,
+then runs the same held-out queries through exact brute-force search (the
+ground truth) and through the IVF index at several `nprobe` values.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ann --sizes 10000 100000 1000000
+
+At 1M vectors of 1536 dimensions the index takes about 6 GB of disk; use
+`--dim` to scale the vectors down on smaller machines.
+"""
+import argparse
+import functools
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import stubs
+
+# One topic per this many vectors, so clusters don't line up with topics
+_VECTORS_PER_TOPIC = 20
+_BATCH = 10_000
+
+
+def _embeddings(centers: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """Vectors scattered around topic centers, like embeddings of related chunks."""
+    topics = rng.integers(0, len(centers), count)
+    return (centers[topics] + rng.standard_normal((count, centers.shape[1]))).astype(np.float32)
+
+
+def _latencies(search, queries: np.ndarray, k: int) -> tuple[list[set], np.ndarray]:
+    results = []
+    times = []
+
+    for query in queries:
+        start = time.perf_counter()
+        matches = search(query, k)
+        times.append(time.perf_counter() - start)
+        results.append({match["id"] for match in matches})
+
+    return results, np.array(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    args = parser.parse_args()
+
+    stubs.install()
+
+    from app.services.vector_store import IVFVectorStore, LocalVectorStore
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'vectors':>9} {'search':<12} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for size in args.sizes:
+        centers = rng.standard_normal((max(1, size // _VECTORS_PER_TOPIC), args.dim)).astype(np.float32)
+        queries = _embeddings(centers, args.queries, rng)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Train once at the final size instead of at every doubling
+            store = IVFVectorStore(tmp, min_train_size=size)
+
+            start = time.perf_counter()
+            for offset in range(0, size, _BATCH):
+                batch = _embeddings(centers, min(_BATCH, size - offset), rng)
+                store.upsert([(f"v{offset + i}", vector, {}) for i, vector in enumerate(batch)])
+            build = time.perf_counter() - start
+
+            # Exact search over the same vectors: shadow the IVF scoring with the brute-force one
+            store._score = functools.partial(LocalVectorStore._score, store)
+            exact, times = _latencies(store.query, queries, args.k)
+            del store._score
+            print(f"{size:>9} {'exact':<12} {1.0:>9.3f} {np.percentile(times, 50):>8.2f} "
+                  f"{np.percentile(times, 99):>8.2f}")
+
+            for nprobe in args.nprobe:
+                store.nprobe = nprobe
+                approximate, times = _latencies(store.query, queries, args.k)
+                recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+                print(f"{size:>9} {f'ivf/{nprobe}':<12} {recall:>9.3f} {np.percentile(times, 50):>8.2f} "
+                      f"{np.percentile(times, 99):>8.2f}")
+
+            print(f"{size:>9} built in {build:.1f}s ({len(store.centroids)} lists)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+End-to-end benchmark of the app against stubbed OpenAI, Pinecone and R2.
+
+Drives the FastAPI app in-process. It uploads `--files` synthetic documents
+and waits for their ingestion jobs (files/sec, chunks/sec), then sends
+`--requests` chat questions at each `--concurrency` and reports latency
+percentiles. Every external call sleeps for a lognormal latency around the
+given median (`--sigma`) with a slow tail (`--tail`, `--tail-factor`),
+seeded so runs are reproducible. With `--s3-latency`, documents are stored
+in a stubbed R2 bucket instead of on disk.
+
+Results, including the memory high-water mark of the process, are printed
+and written as JSON with `--output`. `--compare` prints the change against
+an earlier result file, e.g. one from the previous commit.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_app --output before.json
+    python -m benchmarks.bench_app --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import stubs
+from benchmarks.synthetic import make_text
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _commit() -> str | None:
+    result = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+async def _ingest(client, files: int, words: int) -> dict:
+    semaphore = asyncio.Semaphore(8)
+
+    async def upload(i: int) -> str:
+        async with semaphore:
+            content = make_text(words, seed=i).encode()
+            response = await client.post("/api/v1/documents", files={"file": (f"bench_{i}.txt", content)})
+            response.raise_for_status()
+            return response.json()["job_id"]
+
+    async def wait(job_id: str) -> dict:
+        while True:
+            job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            await asyncio.sleep(0.02)
+
+    start = time.perf_counter()
+    job_ids = await asyncio.gather(*(upload(i) for i in range(files)))
+    jobs = await asyncio.gather(*(wait(job_id) for job_id in job_ids))
+    elapsed = time.perf_counter() - start
+
+    chunks = sum(job["chunks_created"] or 0 for job in jobs)
+    durations = [job["duration_seconds"] for job in jobs if job["duration_seconds"] is not None]
+
+    return {
+        "files": files,
+        "failed": sum(job["status"] == "failed" for job in jobs),
+        "chunks": chunks,
+        "seconds": elapsed,
+        "files_per_sec": files / elapsed,
+        "chunks_per_sec": chunks / elapsed,
+        "job_p50_ms": statistics.median(durations) * 1000 if durations else None,
+    }
+
+
+async def _chat(client, requests: int, concurrency: int, offset: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            # Distinct questions, so the answer cache doesn't serve them
+            question = f"What does clause {offset + i} of the contract say?"
+            start = time.perf_counter()
+            response = await client.post("/api/v1/chat", json={"question": question, "max_sources": 5})
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {"requests": requests, "errors": errors, "requests_per_sec": requests / elapsed, **_percentiles(latencies)}
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def _compare(path: str, results: dict) -> None:
+    with open(path) as f:
+        before = json.load(f)
+
+    print(f"\nchange against {path} ({before.get('commit')}):")
+    old, new = _flatten(before["results"]), _flatten(results["results"])
+    for name, value in new.items():
+        if name in old and old[name]:
+            print(f"  {name:<40} {old[name]:12.1f} -> {value:12.1f} ({(value - old[name]) / old[name]:+.1%})")
+
+
+async def _run(args) -> dict:
+    import httpx
+    from app.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            results["ingestion"] = await _ingest(client, args.files, args.words)
+            print(
+                f"ingestion: {args.files} files, {results['ingestion']['chunks']} chunks in "
+                f"{results['ingestion']['seconds']:.2f}s ({results['ingestion']['files_per_sec']:.1f} files/s, "
+                f"{results['ingestion']['chunks_per_sec']:.0f} chunks/s)"
+            )
+
+            results["chat"] = {}
+            for i, concurrency in enumerate(args.concurrency):
+                chat = await _chat(client, args.requests, concurrency, offset=i * args.requests)
+                results["chat"][f"concurrency_{concurrency}"] = chat
+                print(
+                    f"chat concurrency={concurrency:<3} {chat['requests_per_sec']:7.1f} req/s  "
+                    f"p50 {chat['p50_ms']:7.1f} ms  p90 {chat['p90_ms']:7.1f} ms  "
+                    f"p99 {chat['p99_ms']:7.1f} ms  errors {chat['errors']}"
+                )
+
+    results["memory"] = {"max_rss_mb": _max_rss_mb()}
+    print(f"memory high-water mark: {results['memory']['max_rss_mb']:.0f} MB")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--words", type=int, default=3000, help="words per document")
+    parser.add_argument("--requests", type=int, default=200, help="chat requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--embed-per-input", type=float, default=0.0005)
+    parser.add_argument("--index-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--s3-latency", type=float, default=None, help="store documents in a stubbed R2 bucket")
+    parser.add_argument("--s3-seconds-per-mb", type=float, default=0.01)
+    parser.add_argument("--sigma", type=float, default=0.3, help="lognormal spread of every latency (0: fixed)")
+    parser.add_argument("--tail", type=float, default=0.01, help="share of calls in the slow tail")
+    parser.add_argument("--tail-factor", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-store", default="pinecone", choices=["pinecone", "local", "ivf"])
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    def latency(median: float, seed: int) -> stubs.Latency:
+        return stubs.Latency(median, args.sigma, args.tail, args.tail_factor, seed=args.seed + seed)
+
+    stubs.install(
+        embed_latency=latency(args.embed_latency, 1),
+        embed_per_input=args.embed_per_input,
+        index_latency=latency(args.index_latency, 2),
+        llm_latency=latency(args.llm_latency, 3),
+        s3_latency=None if args.s3_latency is None else latency(args.s3_latency, 4),
+        s3_seconds_per_mb=args.s3_seconds_per_mb,
+    )
+    os.environ["VECTOR_STORE"] = args.vector_store
+
+    output = os.path.abspath(args.output) if args.output else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+    commit = _commit()
+
+    # Run in a scratch directory: jobs, indexes and uploads are created relative to it
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        results = {
+            "commit": commit,
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "config": {name: value for name, value in vars(args).items() if name not in ("output", "compare")},
+            "results": asyncio.run(_run(args)),
+        }
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {output}")
+
+    if compare:
+        _compare(compare, results)
+
+
+if __name__ == "__main__":
+    main()
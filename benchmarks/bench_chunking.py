@@ -0,0 +1,62 @@
+"""
+Chunking strategies on a fixed corpus: chunk count, chunk size in tokens,
+throughput and how many chunks change after a small edit (which is what
+incremental re-ingestion has to re-embed).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chunking --words 200000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import stubs
+from benchmarks.synthetic import make_markdown, make_text
+
+
+def _edit(text: str) -> str:
+    """Insert one sentence in the middle of the text."""
+    middle = text.index(". ", len(text) // 2) + 2
+    return text[:middle] + "This sentence was added in an edit. " + text[middle:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=200_000)
+    args = parser.parse_args()
+
+    stubs.install()
+
+    from app.services import tokenizer
+    from app.services.chunking_service import STRATEGIES, get_chunker
+
+    corpora = {
+        "plain.txt": make_text(args.words),
+        "guide.md": make_markdown(args.words // 300),
+    }
+
+    print(f"tokenizer: {'tiktoken ' + tokenizer.ENCODING_NAME if tokenizer._get_encoding() else 'regex fallback'}")
+    print(f"{'corpus':<10} {'strategy':<11} {'chunks':>7} {'mean tok':>9} {'max tok':>8} "
+          f"{'MB/s':>7} {'changed':>8}")
+
+    for filename, text in corpora.items():
+        # Text arrives in 64KB blocks, as from extraction_service
+        blocks = [text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024)]
+        edited = _edit(text)
+
+        for strategy in STRATEGIES:
+            start = time.perf_counter()
+            chunks = list(get_chunker(strategy, filename).split(blocks))
+            elapsed = time.perf_counter() - start
+
+            sizes = [tokenizer.count_tokens(chunk) for chunk in chunks]
+            after = set(get_chunker(strategy, filename).split([edited]))
+            changed = len(after - set(chunks))
+
+            print(f"{filename:<10} {strategy:<11} {len(chunks):>7} {statistics.mean(sizes):>9.1f} "
+                  f"{max(sizes):>8} {len(text) / elapsed / 1e6:>7.2f} {changed:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+PDF extraction: whole-text concatenation vs streaming and parallel extraction.
+
+Generates a synthetic PDF and reports pages/sec, chunk count and the peak
+memory traced in the API process for each mode. Memory is measured in a
+separate pass because tracing slows extraction down. The parallel mode is
+run twice: the first pass includes starting the worker processes. It only
+beats the streaming mode on machines with more than one core.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extraction --pages 400 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import stubs
+from benchmarks.synthetic import make_pdf
+
+
+def _legacy_chunks(file_path: str) -> list[str]:
+    """The previous implementation: build the whole text, then slice it."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() or ""
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunk = text[start:start + 500]
+        if chunk.strip():
+            chunks.append(chunk.strip())
+        start += 450
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-memory", action="store_true")
+    args = parser.parse_args()
+
+    stubs.install()
+
+    from app.config import settings
+    from app.services import extraction_service
+    from app.services.chunking_service import CharacterChunker
+
+    def streaming(file_path: str) -> int:
+        return sum(1 for _ in CharacterChunker().split(extraction_service.iter_text(file_path)))
+
+    modes = {
+        "concatenate": lambda path: len(_legacy_chunks(path)),
+        "streaming": streaming,
+        f"parallel x{args.workers} (cold)": streaming,
+        f"parallel x{args.workers}": streaming,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        make_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        for name, run in modes.items():
+            settings.pdf_extraction_workers = args.workers if name.startswith("parallel") else 1
+            settings.pdf_parallel_min_pages = 1
+
+            start = time.perf_counter()
+            chunks = run(path)
+            elapsed = time.perf_counter() - start
+            line = f"{name:>19}: {elapsed:6.2f}s {args.pages / elapsed:7.1f} pages/sec {chunks} chunks"
+
+            if not args.skip_memory and "cold" not in name:
+                tracemalloc.start()
+                run(path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                line += f"  peak {peak / 1e6:6.1f} MB"
+
+            print(line)
+
+    extraction_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
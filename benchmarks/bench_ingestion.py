@@ -0,0 +1,59 @@
+"""
+Ingestion throughput: per-chunk vs batched embedding and upsert.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingestion --chunks 300
+"""
+import argparse
+import time
+
+from benchmarks import stubs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--embed-per-input", type=float, default=0.0005)
+    parser.add_argument("--index-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    embeddings, index, _ = stubs.install(args.embed_latency, args.embed_per_input, args.index_latency)
+
+    from app.services import pinecone_service
+    from app.services.chunking_service import CharacterChunker
+
+    text = " ".join(f"word{i}" for i in range(args.chunks * 70))
+    chunks = list(CharacterChunker().split([text]))[:args.chunks]
+    documents = [
+        (f"bench_{i}", chunk, {"filename": "bench.txt", "chunk_index": i})
+        for i, chunk in enumerate(chunks)
+    ]
+
+    results = {}
+
+    for name in ("per-chunk", "batched"):
+        embeddings.calls = 0
+        index.calls = 0
+        start = time.perf_counter()
+
+        if name == "per-chunk":
+            for doc_id, chunk, metadata in documents:
+                pinecone_service.upsert_document(doc_id, chunk, dict(metadata))
+        else:
+            pinecone_service.upsert_documents([(d, c, dict(m)) for d, c, m in documents])
+
+        elapsed = time.perf_counter() - start
+        results[name] = len(documents) / elapsed
+        print(
+            f"{name:>10}: {len(documents)} chunks in {elapsed:.2f}s "
+            f"({results[name]:.1f} chunks/sec, "
+            f"{embeddings.calls} embedding calls, {index.calls} upsert calls)"
+        )
+
+    print(f"speedup: {results['batched'] / results['per-chunk']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
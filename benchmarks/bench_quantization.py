@@ -0,0 +1,112 @@
+"""
+Compact vectors: recall@k, bytes per vector and query latency of reduced
+embedding dimensions and quantized codes against full-size exact search.
+
+Synthetic embeddings mimic `text-embedding-3` models, which are trained so
+that their leading dimensions carry most of the signal: their variance
+decays along the dimensions, and a reduced embedding is the leading
+`dimensions` components, normalized again. Every combination of
+`--dims` and quantization is queried through a `LocalVectorStore` and
+compared with exact search over the full-size vectors (the ground truth).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_quantization --size 100000 --dims 1536 512 256
+
+"Scanned" is the bytes read per vector by a query (the codes when
+quantized); "stored" adds the float vectors kept for re-ranking.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import stubs
+
+# One topic per this many vectors
+_VECTORS_PER_TOPIC = 20
+_BATCH = 10_000
+
+
+def _embeddings(centers: np.ndarray, decay: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """Vectors scattered around topic centers, with variance decaying along the dimensions."""
+    topics = rng.integers(0, len(centers), count)
+    noise = rng.standard_normal((count, centers.shape[1]))
+    return ((centers[topics] + noise) * decay).astype(np.float32)
+
+
+def _reduce(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    reduced = np.ascontiguousarray(vectors[:, :dimensions])
+    return reduced / np.linalg.norm(reduced, axis=1, keepdims=True)
+
+
+def _search(store, queries: np.ndarray, k: int) -> tuple[list[set], np.ndarray]:
+    results = []
+    times = []
+
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.query(query, k)
+        times.append(time.perf_counter() - start)
+        results.append({match["id"] for match in matches})
+
+    return results, np.array(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, nargs="+", default=[1536, 512, 256])
+    parser.add_argument("--quantization", nargs="+", default=["none", "int8", "binary"])
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    stubs.install()
+
+    from app.services.quantization import create_quantizer
+    from app.services.vector_store import LocalVectorStore
+
+    rng = np.random.default_rng(0)
+    full = max(args.dims)
+    decay = 1 / np.sqrt(1 + np.arange(full) / 32)
+
+    centers = rng.standard_normal((max(1, args.size // _VECTORS_PER_TOPIC), full))
+    vectors = _embeddings(centers, decay, args.size, rng)
+    queries = _embeddings(centers, decay, args.queries, rng)
+    ids = [f"v{i}" for i in range(args.size)]
+
+    # Ground truth: exact search over the full-size vectors
+    normalized = _reduce(vectors, full)
+    truth = [
+        {ids[i] for i in np.argsort(-(normalized @ query))[:args.k]}
+        for query in _reduce(queries, full)
+    ]
+
+    print(f"{'dims':>5} {'quantization':<12} {'recall@' + str(args.k):>9} {'scanned B':>10} {'stored B':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+
+    for dimensions in args.dims:
+        reduced = _reduce(vectors, dimensions)
+
+        for quantization in args.quantization:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = LocalVectorStore(tmp, quantization=quantization, rerank_factor=args.rerank_factor)
+                for offset in range(0, args.size, _BATCH):
+                    batch = reduced[offset:offset + _BATCH]
+                    store.upsert([(ids[offset + i], vector, {}) for i, vector in enumerate(batch)])
+
+                results, times = _search(store, _reduce(queries, dimensions), args.k)
+
+            recall = np.mean([len(r & t) / len(t) for r, t in zip(results, truth)])
+            quantizer = create_quantizer(quantization, dimensions)
+            scanned = quantizer.width if quantizer else 4 * dimensions
+            stored = 4 * dimensions + (quantizer.width if quantizer else 0)
+            print(f"{dimensions:>5} {quantization:<12} {recall:>9.3f} {scanned:>10} {stored:>9} "
+                  f"{np.percentile(times, 50):>8.2f} {np.percentile(times, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup cost: time to import the app, broken down by module.
+
+Imports `app.main` in fresh interpreters with `python -X importtime`, with
+no credentials in the environment, and reports the median total import time
+and the modules with the highest cumulative import time. `--warmup` also
+times the lifespan warm-up (clients, parsers, tokenizer, vector store) with
+stubbed API clients. Modules are grouped by top-level package with
+`--packages`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_WARMUP = """
+import time
+from benchmarks import stubs
+stubs.install()
+from app.main import _warm_up
+start = time.perf_counter()
+_warm_up()
+print(time.perf_counter() - start)
+"""
+
+
+def _import_times(env: dict) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module imported by `app.main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+
+    return times
+
+
+def _clean_env() -> dict:
+    """The current environment without API credentials or a .env override."""
+    return {
+        name: value for name, value in os.environ.items()
+        if not name.startswith(("OPENAI_", "PINECONE_", "R2_"))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--packages", action="store_true", help="group modules by top-level package")
+    parser.add_argument("--warmup", action="store_true", help="also time the lifespan warm-up")
+    args = parser.parse_args()
+
+    env = _clean_env()
+    runs = [_import_times(env) for _ in range(args.runs)]
+
+    totals = [run["app.main"] for run in runs]
+    print(f"import app.main: median {statistics.median(totals) / 1000:.0f} ms "
+          f"(min {min(totals) / 1000:.0f} ms, {args.runs} runs)")
+
+    medians = {
+        module: statistics.median(run.get(module, 0) for run in runs)
+        for module in runs[0]
+    }
+
+    if args.packages:
+        # A package's cumulative time already includes its submodules
+        medians = {module: time for module, time in medians.items() if "." not in module}
+
+    print(f"\n{'module':<48} {'cumulative ms':>14}")
+    for module, time in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{module:<48} {time / 1000:14.1f}")
+
+    if args.warmup:
+        # Run in a scratch directory: the local vector store and caches create files
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, "-c", _WARMUP], cwd=tmp,
+                env={**env, "VECTOR_STORE": "local", "PYTHONPATH": os.getcwd()},
+                capture_output=True, text=True, check=True
+            )
+        print(f"\nwarm-up: {float(result.stdout.strip().splitlines()[-1]) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
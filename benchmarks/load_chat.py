@@ -0,0 +1,76 @@
+"""
+Chat load test: concurrent throughput of a single app instance.
+
+Drives `POST /api/v1/chat` in-process against stubbed OpenAI and Pinecone
+backends at increasing concurrency. With `--baseline`, the same load is also
+sent to a route that calls the synchronous `generate_answer`, which blocks
+the event loop the way the handlers used to. With `--batch`, the same
+questions are also sent as a single `POST /api/v1/chat/batch`.
+
+Run from the repository root:
+
+    python -m benchmarks.load_chat --requests 64 --baseline --batch
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import stubs
+
+
+async def _run(client, path: str, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            response = await client.post(path, json={"question": f"question {i}"})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--baseline", action="store_true")
+    parser.add_argument("--batch", action="store_true")
+    args = parser.parse_args()
+
+    _, index, _ = stubs.install(embed_latency=0.02, index_latency=0.01, llm_latency=args.llm_latency)
+    index.vectors["doc_0"] = ([0.0], {"filename": "doc.txt", "chunk_index": 0, "text": "stub"})
+
+    import httpx
+    from app.main import app
+    from app.services.llm_service import generate_answer
+
+    if args.baseline:
+        @app.post("/baseline-chat")
+        async def baseline_chat(body: dict):
+            return generate_answer(body["question"])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        paths = {"async": "/api/v1/chat"}
+        if args.baseline:
+            paths["blocking"] = "/baseline-chat"
+
+        for name, path in paths.items():
+            for concurrency in args.concurrency:
+                rps = await _run(client, path, args.requests, concurrency)
+                print(f"{name:>8} concurrency={concurrency:<3} {rps:7.1f} req/s")
+
+        if args.batch:
+            questions = [f"batch question {i}" for i in range(args.requests)]
+            start = time.perf_counter()
+            response = await client.post("/api/v1/chat/batch", json={"questions": questions})
+            response.raise_for_status()
+            rate = args.requests / (time.perf_counter() - start)
+            print(f"{'batch':>8} {len(questions)} questions    {rate:7.1f} questions/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,379 @@
+"""
+Local stand-ins for the OpenAI, Pinecone and R2 (S3) clients.
+
+Call `install()` before importing anything from `app` so the services pick
+up the stubs instead of constructing real clients. Every call sleeps for a
+latency drawn from a `Latency` distribution; plain numbers are fixed
+latencies.
+"""
+import asyncio
+import hashlib
+import io
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class Latency:
+    """
+    Lognormal latency around `median` seconds with spread `sigma` (0 for a
+    fixed latency). A share `tail` of calls takes `tail_factor` times longer,
+    like requests that hit a retry or a slow replica.
+    """
+
+    def __init__(self, median: float, sigma: float = 0.0, tail: float = 0.0, tail_factor: float = 10.0,
+                 seed: int | None = None):
+        self.median = median
+        self.sigma = sigma
+        self.tail = tail
+        self.tail_factor = tail_factor
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+
+        value = self.median * math.exp(self._rng.gauss(0, self.sigma)) if self.sigma else self.median
+        if self.tail and self._rng.random() < self.tail:
+            value *= self.tail_factor
+        return value
+
+    def __repr__(self):
+        return f"Latency(median={self.median}, sigma={self.sigma}, tail={self.tail}, tail_factor={self.tail_factor})"
+
+
+def _latency(value) -> Latency:
+    return value if isinstance(value, Latency) else Latency(value)
+
+
+def _fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list[float]:
+    seed = hashlib.sha256(text.encode()).digest()
+    return [seed[i % len(seed)] / 255.0 for i in range(dimensions)]
+
+
+def _tokens(text: str) -> int:
+    return len(text.split())
+
+
+def _embedding_response(inputs: list[str], dimensions: int | None) -> SimpleNamespace:
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    return SimpleNamespace(
+        data=[SimpleNamespace(index=i, embedding=_fake_embedding(text, dimensions)) for i, text in enumerate(inputs)],
+        usage=SimpleNamespace(total_tokens=sum(_tokens(text) for text in inputs)),
+    )
+
+
+class StubEmbeddings:
+    """Mimics `client.embeddings` with a round-trip latency plus a per-input cost."""
+
+    def __init__(self, latency, per_input_latency: float):
+        self.latency = _latency(latency)
+        self.per_input_latency = per_input_latency
+        self.calls = 0
+
+    def create(self, input, model, dimensions=None, **kwargs):
+        inputs = [input] if isinstance(input, str) else list(input)
+        self.calls += 1
+        time.sleep(self.latency.sample() + self.per_input_latency * len(inputs))
+        return _embedding_response(inputs, dimensions)
+
+
+class StubAsyncEmbeddings(StubEmbeddings):
+    """Async `client.embeddings` that sleeps without blocking the loop."""
+
+    async def create(self, input, model, dimensions=None, **kwargs):
+        inputs = [input] if isinstance(input, str) else list(input)
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample() + self.per_input_latency * len(inputs))
+        return _embedding_response(inputs, dimensions)
+
+
+def _completion(messages) -> SimpleNamespace:
+    question = messages[-1]["content"].rsplit("Question: ", 1)[-1]
+    message = SimpleNamespace(content=f"Stub answer to: {question}")
+    usage = SimpleNamespace(
+        prompt_tokens=sum(_tokens(m["content"]) for m in messages), completion_tokens=_tokens(message.content)
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class StubCompletions:
+    """Mimics `client.chat.completions`; the latency is the time to the first token."""
+
+    def __init__(self, latency):
+        self.latency = _latency(latency)
+        self.calls = 0
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return _completion(messages)
+
+
+class StubAsyncCompletions(StubCompletions):
+
+    async def create(self, model, messages, stream=False, stream_options=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        if stream:
+            return self._stream(_completion(messages), (stream_options or {}).get("include_usage", False))
+        return _completion(messages)
+
+    async def _stream(self, completion, include_usage: bool):
+        for word in completion.choices[0].message.content.split(" "):
+            delta = SimpleNamespace(content=word + " ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        if include_usage:
+            yield SimpleNamespace(choices=[], usage=completion.usage)
+
+
+class StubOpenAI:
+    embeddings = StubEmbeddings(latency=0.0, per_input_latency=0.0)
+    chat = SimpleNamespace(completions=StubCompletions(latency=0.0))
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubAsyncOpenAI:
+    embeddings = StubAsyncEmbeddings(latency=0.0, per_input_latency=0.0)
+    chat = SimpleNamespace(completions=StubAsyncCompletions(latency=0.0))
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def close(self):
+        pass
+
+
+class StubIndex:
+    """Mimics a Pinecone `Index` with a latency per call."""
+
+    def __init__(self, latency):
+        self.latency = _latency(latency)
+        self.vectors = {}
+        self.calls = 0
+
+    def upsert(self, vectors):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        for doc_id, values, metadata in vectors:
+            self.vectors[doc_id] = (values, metadata)
+
+    def update(self, id, set_metadata):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        values, metadata = self.vectors[id]
+        self.vectors[id] = (values, {**metadata, **set_metadata})
+
+    def query(self, vector, top_k, include_metadata=True):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        matches = [
+            SimpleNamespace(id=doc_id, score=0.9, metadata=metadata)
+            for doc_id, (_, metadata) in list(self.vectors.items())[:top_k]
+        ]
+        return SimpleNamespace(matches=matches)
+
+    def describe_index_stats(self):
+        # Pinecone indexes have a fixed dimension; the stub's follows EMBEDDING_DIMENSIONS
+        dimension = int(os.environ.get("EMBEDDING_DIMENSIONS") or 0) or EMBEDDING_DIMENSIONS
+        return SimpleNamespace(dimension=dimension, total_vector_count=len(self.vectors))
+
+    def list(self, prefix):
+        yield [doc_id for doc_id in list(self.vectors) if doc_id.startswith(prefix)]
+
+    def delete(self, ids):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        for doc_id in ids:
+            self.vectors.pop(doc_id, None)
+
+
+class StubPinecone:
+    index = StubIndex(latency=0.0)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def Index(self, name):
+        return self.index
+
+
+def _client_error(status: int, operation: str):
+    from botocore.exceptions import ClientError
+
+    return ClientError(
+        {"Error": {"Code": str(status)}, "ResponseMetadata": {"HTTPStatusCode": status, "HTTPHeaders": {}}},
+        operation,
+    )
+
+
+class StubS3:
+    """
+    Mimics the boto3 S3 client calls used by `storage_service`, keeping
+    objects in memory. Each request takes a latency plus `seconds_per_mb`
+    for the bytes sent or received.
+    """
+
+    def __init__(self, latency, seconds_per_mb: float = 0.0):
+        self.latency = _latency(latency)
+        self.seconds_per_mb = seconds_per_mb
+        self.objects = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self, size: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency.sample() + self.seconds_per_mb * size / (1024 * 1024))
+
+    def _head(self, key: str) -> dict:
+        body, modified = self.objects[key]
+        return {
+            "content-length": str(len(body)),
+            "etag": f'"{hashlib.md5(body).hexdigest()}"',
+            "last-modified": modified.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        }
+
+    def upload_file(self, Filename, Bucket, Key, Config=None, **kwargs):
+        with open(Filename, "rb") as f:
+            body = f.read()
+        self._request(len(body))
+        self.objects[Key] = (body, datetime.now(timezone.utc).replace(microsecond=0))
+
+    def copy(self, CopySource, Bucket, Key, Config=None, **kwargs):
+        if CopySource["Key"] not in self.objects:
+            raise _client_error(404, "HeadObject")
+        self._request()
+        body = self.objects[CopySource["Key"]][0]
+        self.objects[Key] = (body, datetime.now(timezone.utc).replace(microsecond=0))
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        if Key not in self.objects:
+            raise _client_error(404, "HeadObject")
+        body = self.objects[Key][0]
+        self._request(len(body))
+        with open(Filename, "wb") as f:
+            f.write(body)
+
+    def head_object(self, Bucket, Key):
+        self._request()
+        if Key not in self.objects:
+            raise _client_error(404, "HeadObject")
+        return {"ContentLength": len(self.objects[Key][0]), "ResponseMetadata": {"HTTPHeaders": self._head(Key)}}
+
+    def get_object(self, Bucket, Key, Range=None, IfNoneMatch=None, IfModifiedSince=None, IfMatch=None,
+                   IfUnmodifiedSince=None):
+        from botocore.response import StreamingBody
+
+        if Key not in self.objects:
+            self._request()
+            raise _client_error(404, "GetObject")
+
+        body, modified = self.objects[Key]
+        headers = self._head(Key)
+
+        if (IfMatch and IfMatch != headers["etag"]) or (IfUnmodifiedSince and modified > IfUnmodifiedSince):
+            self._request()
+            raise _client_error(412, "GetObject")
+
+        if (IfNoneMatch and IfNoneMatch == headers["etag"]) or (IfModifiedSince and modified <= IfModifiedSince):
+            self._request()
+            error = _client_error(304, "GetObject")
+            error.response["ResponseMetadata"]["HTTPHeaders"] = headers
+            raise error
+
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            start, end = int(start or 0), min(int(end) if end else len(body) - 1, len(body) - 1)
+            if start >= len(body):
+                self._request()
+                raise _client_error(416, "GetObject")
+            headers["content-range"] = f"bytes {start}-{end}/{len(body)}"
+            body = body[start:end + 1]
+            headers["content-length"] = str(len(body))
+
+        self._request(len(body))
+        return {
+            "Body": StreamingBody(io.BytesIO(body), len(body)),
+            "ContentLength": len(body),
+            "ResponseMetadata": {"HTTPStatusCode": 200, "HTTPHeaders": headers},
+        }
+
+    def delete_object(self, Bucket, Key):
+        self._request()
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        self._request()
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+
+    def get_paginator(self, operation):
+        stub = self
+
+        class Paginator:
+            def paginate(self, Bucket):
+                keys = sorted(stub.objects)
+                for i in range(0, max(len(keys), 1), 1000):
+                    stub._request()
+                    yield {"Contents": [{"Key": key, "Size": len(stub.objects[key][0])} for key in keys[i:i + 1000]]}
+
+        return Paginator()
+
+    def close(self):
+        pass
+
+
+def install(embed_latency=0.05, embed_per_input: float = 0.0005, index_latency=0.02, llm_latency=0.5,
+            s3_latency=None, s3_seconds_per_mb: float = 0.0) -> tuple[StubEmbeddings, StubIndex, StubS3 | None]:
+    """
+    Patch the client constructors and return the shared stub objects.
+
+    Latencies are seconds or `Latency` distributions. The sync and async
+    OpenAI stubs share the same latency settings; the returned embeddings
+    stub is the sync one. With `s3_latency`, R2 storage is enabled and
+    served by the returned S3 stub.
+    """
+    import openai
+    import pinecone
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("OPENAI_MODEL", "stub")
+    os.environ.setdefault("PINECONE_API_KEY", "stub")
+    os.environ.setdefault("PINECONE_INDEX_NAME", "stub")
+    # Benchmarks repeat the same texts and questions; caches would turn them into hits
+    os.environ.setdefault("EMBEDDING_CACHE", "none")
+    os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+    StubOpenAI.embeddings = StubEmbeddings(embed_latency, embed_per_input)
+    StubOpenAI.chat = SimpleNamespace(completions=StubCompletions(llm_latency))
+    StubAsyncOpenAI.embeddings = StubAsyncEmbeddings(embed_latency, embed_per_input)
+    StubAsyncOpenAI.chat = SimpleNamespace(completions=StubAsyncCompletions(llm_latency))
+    StubPinecone.index = StubIndex(index_latency)
+    openai.OpenAI = StubOpenAI
+    openai.AsyncOpenAI = StubAsyncOpenAI
+    pinecone.Pinecone = StubPinecone
+
+    s3 = None
+    if s3_latency is not None:
+        import boto3
+
+        for name in ("R2_ACCOUNT_ID", "R2_ACCESS_KEY_ID", "R2_SECRET_ACCESS_KEY", "R2_BUCKET_NAME"):
+            os.environ.setdefault(name, "stub")
+
+        s3 = StubS3(s3_latency, s3_seconds_per_mb)
+        boto3.client = lambda *args, **kwargs: s3
+
+    return StubOpenAI.embeddings, StubPinecone.index, s3
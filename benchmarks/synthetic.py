@@ -0,0 +1,86 @@
+"""
+Synthetic documents for benchmarks.
+"""
+import random
+
+_WORDS = (
+    "invoice payment refund policy customer order shipping delivery contract "
+    "agreement service warranty product account balance report quarter revenue "
+    "support ticket manual section clause liability notice period term renewal"
+).split()
+
+
+def make_text(words: int, seed: int = 0) -> str:
+    """Deterministic pseudo-English text with sentences and paragraphs."""
+    rng = random.Random(seed)
+    out = []
+
+    for i in range(words):
+        word = rng.choice(_WORDS)
+        out.append(word.capitalize() if i % 12 == 0 else word)
+        if i % 12 == 11:
+            out[-1] += "."
+        if i % 96 == 95:
+            out[-1] += "\n\n"
+
+    return " ".join(out)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0) -> None:
+    """Write a PDF with `pages` pages of text using only the standard Helvetica font."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+
+    for _ in range(pages):
+        lines = [make_text(12, rng.random()) for _ in range(lines_per_page)]
+        content = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        stream = content.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def make_markdown(sections: int, words_per_section: int = 300, seed: int = 0) -> str:
+    """Deterministic Markdown with nested headings, paragraphs and code fences."""
+    rng = random.Random(seed)
+    out = []
+
+    for i in range(sections):
+        level = 1 if i % 8 == 0 else 2 if i % 4 == 0 else 3
+        out.append(f"{'#' * level} {rng.choice(_WORDS).capitalize()} {i}\n\n")
+        out.append(make_text(words_per_section, seed=seed + i))
+        if i % 5 == 0:
+            out.append("\n\n```\n# not a heading\nprint('example')\n```")
+        out.append("\n\n")
+
+    return "".join(out)
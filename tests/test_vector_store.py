@@ -0,0 +1,43 @@
+import numpy as np
+
+from app.services.vector_store import IVFVectorStore
+
+
+def _vectors(count: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, 16)).astype(np.float32)
+
+
+def test_ivf_upsert_reuses_rows_deleted_before_reopen(tmp_path):
+    store = IVFVectorStore(str(tmp_path), nlist=4, min_train_size=60)
+    store.upsert([(f"v{i}", vector, {}) for i, vector in enumerate(_vectors(60, 0))])
+    assert store.centroids is not None
+    store.delete([f"v{i}" for i in range(10)])
+
+    store = IVFVectorStore(str(tmp_path), nlist=4, nprobe=4, min_train_size=60)
+    new = _vectors(10, 1)
+    store.upsert([(f"n{i}", vector, {}) for i, vector in enumerate(new)])
+
+    for i, vector in enumerate(new):
+        assert store.query(vector, 1)[0]["id"] == f"n{i}"
+
+    reopened = IVFVectorStore(str(tmp_path), nlist=4, nprobe=4, min_train_size=60)
+    assert sorted(reopened.rows) == sorted([f"v{i}" for i in range(10, 60)] + [f"n{i}" for i in range(10)])
+
+
+def test_ivf_rows_written_during_training_are_searchable(tmp_path):
+    store = IVFVectorStore(str(tmp_path), nlist=4, nprobe=4, min_train_size=60)
+    during = _vectors(5, 2)
+    kmeans = store._kmeans
+
+    def kmeans_with_upsert(matrix, live_rows):
+        # Training runs without the lock, so upserts can happen meanwhile
+        store.upsert([(f"d{i}", vector, {}) for i, vector in enumerate(during)])
+        return kmeans(matrix, live_rows)
+
+    store._kmeans = kmeans_with_upsert
+    store.upsert([(f"v{i}", vector, {}) for i, vector in enumerate(_vectors(60, 0))])
+
+    assert store.trained_size == 60
+    for i, vector in enumerate(during):
+        assert store.query(vector, 1)[0]["id"] == f"d{i}"
+    assert sorted(row for rows in store.lists for row in rows) == sorted(store.rows.values())